@@ -1,73 +1,208 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context, g
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
 from flask_cors import CORS
-from utils.mock_data import get_mock_weather, get_soil_nutrients
-from models.yield_model import predict_yield_val
+from utils.mock_data import get_soil_nutrients_response
+from models.yield_model import predict_yield_val, predict_yield_batch, extract_features, get_model_stats, get_batcher_stats
+from models.fertilizer_model import recommend_fertilizer
 from config import Config
-from db import init_db
+from db import get_schema_status, get_query_stats
+from db_pool import get_pool_stats
 from routes.auth import auth_bp
 from routes.predictions import predictions_bp
-from auth_db import save_prediction
-from nutrient_comparison import compare_nutrients
+from auth_db import save_prediction, save_predictions_bulk
+from nutrient_comparison import compare_nutrients, get_comparison_matrix, MATRIX_COLUMNS
+from utils.batch_input import parse_batch_records
+from utils.uploads import UploadRequest, InvalidImage, load_thumbnail
+from prediction_writer import get_prediction_writer
+from location_service import get_district_from_gps, get_districts_for_points, get_location_stats
+from reference_data import get_reference_data
+from weather_service import get_weather_service, WeatherUnavailable
+from http_client import get_http_stats
 import os
+import json
 
-import geopandas as gpd
-from shapely.geometry import Point
 
-# Load Gujarat districts GeoJSON once
-districts_gdf = gpd.read_file("india_district.geojson")
-
-def get_district_from_gps(lat, lon):
+def build_prediction_record(data, features, total_yield):
     """
-    Get district and state name from GPS coordinates using GeoJSON
-    
-    GeoJSON columns:
-    - NAME_0: Country (India)
-    - NAME_1: State name
-    - NAME_2: District name
+    Build the predictions-table record for a request and its model output
+    features: [N, P, K, temp, humidity, ph, rainfall, area]
     """
-    point = Point(lon, lat)  # IMPORTANT: (lon, lat)
-
-    for _, row in districts_gdf.iterrows():
-        if row.geometry.contains(point):
-            return {
-                'district': row["NAME_2"],  # District name column in GeoJSON
-                'state': row["NAME_1"]       # State name column in GeoJSON
-            }
-
-    return {'district': 'Unknown', 'state': 'Unknown'}
+    return {
+        'crop': data.get('crop'),
+        'soil_type': data.get('soil_type'),
+        'season': data.get('season'),
+        'area': features[7],
+        'N': features[0],
+        'P': features[1],
+        'K': features[2],
+        'ph': features[5],
+        'state': data.get('state'),
+        'predicted_yield': total_yield / features[7] if features[7] > 0 else 0,
+        'total_yield': total_yield
+    }
 
 
 # Initialize Flask App
 app = Flask(__name__)
 CORS(app)
 
-# Initialize Database
-try:
-    init_db()
-except Exception as e:
-    print(f"Warning: Database initialization failed: {e}")
+# Uploads stream into hashing spool files (utils/uploads.py), size-bounded
+# per file for image endpoints; bodies over MAX_CONTENT_LENGTH are rejected
+# before they are read
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
+
+# Database schema is checked lazily on first use (see db.ensure_schema);
+# bootstrap it once per deployment with `python db.py migrate`
+
+# Prediction history is written in the background so responses don't wait on MySQL
+prediction_writer = None
+if Config.PREDICTION_WRITE_BEHIND:
+    prediction_writer = get_prediction_writer(
+        save_predictions_bulk,
+        Config.PREDICTION_SPILL_DIR,
+        max_queue=Config.PREDICTION_QUEUE_SIZE,
+        batch_size=Config.PREDICTION_BATCH_SIZE,
+        flush_interval=Config.PREDICTION_FLUSH_INTERVAL,
+        fsync=Config.PREDICTION_JOURNAL_FSYNC
+    )
 
 # Register Blueprints
 app.register_blueprint(auth_bp)
 app.register_blueprint(predictions_bp)
 
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({"error": e.description or "Request body too large"}), 413
+
+@app.after_request
+def add_dataset_version_header(response):
+    # Routes answered from reference data record the snapshot version they used
+    version = g.get('dataset_version')
+    if version:
+        response.headers['X-Dataset-Version'] = version
+    return response
+
 
 # --- Routes ---
 
+INVALID_POINT = "Invalid point (lat must be within -90..90 and lon within -180..180)"
+
+def _parse_points(raw_points):
+    """
+    Normalise [[lat, lon] | {"lat", "lon"}, ...] to (lat, lon) tuples
+
+    Entries that are malformed, out of range or not finite (NaN would also
+    make the response invalid JSON) become None.
+    """
+    points = []
+    for raw in raw_points:
+        try:
+            if isinstance(raw, dict):
+                lat, lon = float(raw["lat"]), float(raw["lon"])
+            else:
+                lat, lon = raw
+                lat, lon = float(lat), float(lon)
+        except (KeyError, TypeError, ValueError):
+            points.append(None)
+            continue
+        # NaN fails both comparisons
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            points.append((lat, lon))
+        else:
+            points.append(None)
+    return points
+
 @app.route('/api/weather', methods=['GET'])
 def weather_route():
     lat = request.args.get('lat', type=float)
     lon = request.args.get('lon', type=float)
     if lat is None or lon is None:
         return jsonify({"error": "Missing lat/lon"}), 400
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({"error": "lat/lon out of range"}), 400
+    
+    try:
+        data, cache_status, cell = get_weather_service().get(lat, lon)
+    except WeatherUnavailable as e:
+        return jsonify({"error": str(e)}), 503
     
-    data = get_mock_weather(lat, lon)
-    return jsonify(data)
+    response = jsonify(data)
+    response.headers['X-Weather-Cache'] = cache_status
+    response.headers['X-Weather-Cell'] = cell
+    return response
+
+@app.route('/api/weather', methods=['POST'])
+def weather_bulk_route():
+    """
+    Weather for many coordinates in one request
+    
+    Points in the same geohash cell share one lookup, and distinct cells
+    are fetched concurrently.
+    
+    Request body:
+    {
+        "points": [[23.02, 72.57], {"lat": 21.17, "lon": 72.83}, ...]
+    }
+    
+    Response (in input order):
+    {
+        "results": [
+            {"index": 0, "lat": 23.02, "lon": 72.57, "cell": "ts5dg", "cache": "miss",
+             "rainfall": 120.5, "temperature": 29.1, "humidity": 61.0},
+            {"index": 1, "error": "Invalid point (...)"},
+            ...
+        ],
+        "count": 2,
+        "cells": 1,
+        "errors": 1
+    }
+    """
+    data = request.get_json(silent=True)
+    raw_points = data.get("points") if isinstance(data, dict) else data
+    
+    if not isinstance(raw_points, list):
+        return jsonify({"error": "Expected {\"points\": [[lat, lon], ...]}"}), 400
+    
+    if len(raw_points) > Config.WEATHER_BULK_MAX_POINTS:
+        return jsonify({
+            "error": f"Too many points: {len(raw_points)} (max {Config.WEATHER_BULK_MAX_POINTS})"
+        }), 413
+    
+    points = _parse_points(raw_points)
+    valid = [point for point in points if point is not None]
+    
+    weather = iter(get_weather_service().get_many(valid, max_workers=Config.WEATHER_HTTP_MAX_CONCURRENCY))
+    results = []
+    cells = set()
+    for index, point in enumerate(points):
+        if point is None:
+            results.append({"index": index, "error": INVALID_POINT})
+            continue
+        value, status, cell = next(weather)
+        cells.add(cell)
+        row = {"index": index, "lat": point[0], "lon": point[1], "cell": cell}
+        if value is None:
+            row["error"] = status
+        else:
+            row["cache"] = status
+            row.update(value)
+        results.append(row)
+    
+    return jsonify({
+        "results": results,
+        "count": len(results),
+        "cells": len(cells),
+        "errors": sum(1 for r in results if 'error' in r)
+    })
 
 @app.route('/api/soil_nutrients', methods=['GET'])
 def soil_route():
     """
     Mode 1: Predefined (Dataset-based)
+    
+    Responses are pre-serialized per (crop, soil type); clients sending
+    If-None-Match with the last ETag get 304 Not Modified.
     """
     crop = request.args.get('crop')
     region = request.args.get('region', 'Default') # Optional region
@@ -76,8 +211,16 @@ def soil_route():
     if not crop:
         return jsonify({"error": "Missing crop type"}), 400
         
-    data = get_soil_nutrients(crop, region, soil_type)
-    return jsonify(data)
+    entry, g.dataset_version = get_soil_nutrients_response(crop, region, soil_type)
+    
+    if request.if_none_match.contains(entry.etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    # Revalidate every time: the data file can be hot-reloaded
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/predict_yield', methods=['POST'])
 def predict_yield_route():
@@ -91,16 +234,11 @@ def predict_yield_route():
         # Check if manual or auto values are provided. 
         # For simplicity, we assume the frontend sends the final values to be used.
         
-        features = [
-            float(data.get('N', 0)),
-            float(data.get('P', 0)),
-            float(data.get('K', 0)),
-            float(data.get('temperature', 25)),
-            float(data.get('humidity', 50)),
-            float(data.get('ph', 6.5)),
-            float(data.get('rainfall', 100)),
-            float(data.get('area', 1))
-        ]
+        # Invalid or non-finite values never reach the shared batcher
+        try:
+            features = extract_features(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         predicted_yield = predict_yield_val(features)
         
@@ -112,20 +250,11 @@ def predict_yield_route():
         user_email = data.get('user_email')
         if user_email:
             try:
-                prediction_data = {
-                    'crop': data.get('crop'),
-                    'soil_type': data.get('soil_type'),
-                    'season': data.get('season'),
-                    'area': features[7],
-                    'N': features[0],
-                    'P': features[1],
-                    'K': features[2],
-                    'ph': features[5],
-                    'state': data.get('state'),
-                    'predicted_yield': total_yield / features[7] if features[7] > 0 else 0,
-                    'total_yield': total_yield
-                }
-                save_prediction(user_email, prediction_data)
+                prediction_data = build_prediction_record(data, features, total_yield)
+                if prediction_writer is not None:
+                    prediction_writer.submit(user_email, prediction_data)
+                else:
+                    save_prediction(user_email, prediction_data)
             except Exception as save_error:
                 print(f"Warning: Failed to save prediction: {save_error}")
                 # Continue even if save fails
@@ -137,14 +266,117 @@ def predict_yield_route():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/predict_yield/batch', methods=['POST'])
+def predict_yield_batch_route():
+    """
+    Predict yield for many field records in one request
+    
+    Accepts a JSON array, {"records": [...], "user_email": ...},
+    a CSV or NDJSON body, or a multipart 'file' upload (.csv / .ndjson).
+    Each record has the same fields as /api/predict_yield.
+    
+    Response:
+    {
+        "results": [
+            {"index": 0, "predicted_yield_per_ha": ..., "total_yield": ..., "saved": true},
+            {"index": 1, "error": "Invalid value for 'N': 'abc'"},
+            ...
+        ],
+        "count": 2,
+        "errors": 1
+    }
+    """
+    try:
+        try:
+            records, defaults, parse_errors = parse_batch_records(request)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        if len(records) > Config.BATCH_MAX_ROWS:
+            return jsonify({
+                "error": f"Batch too large: {len(records)} records (max {Config.BATCH_MAX_ROWS})"
+            }), 413
+        
+        results = [None] * len(records)
+        valid_rows = []
+        feature_rows = []
+        
+        # Validate every record first so the model runs once over the valid rows
+        for index, record in enumerate(records):
+            if not isinstance(record, dict):
+                results[index] = {"index": index, "error": "Record must be an object"}
+                continue
+            row = dict(defaults)
+            row.update(record)
+            try:
+                feature_rows.append(extract_features(row))
+            except ValueError as e:
+                results[index] = {"index": index, "error": str(e)}
+                continue
+            valid_rows.append((index, row))
+        
+        predictions = predict_yield_batch(feature_rows)
+        
+        to_save = []
+        save_positions = []
+        for (index, row), features, total_yield in zip(valid_rows, feature_rows, predictions):
+            results[index] = {
+                "index": index,
+                "predicted_yield_per_ha": total_yield / features[7] if features[7] > 0 else 0,
+                "total_yield": total_yield
+            }
+            if row.get('user_email'):
+                to_save.append((row['user_email'], build_prediction_record(row, features, total_yield)))
+                save_positions.append(index)
+        
+        # Persist all predictions that belong to a user in one bulk insert
+        if to_save:
+            try:
+                saved = save_predictions_bulk(to_save)
+                for index, ok in zip(save_positions, saved):
+                    results[index]["saved"] = ok
+                    if not ok:
+                        results[index]["save_error"] = "User does not exist"
+            except Exception as save_error:
+                print(f"Warning: Failed to save batch predictions: {save_error}")
+                for index in save_positions:
+                    results[index]["saved"] = False
+                    results[index]["save_error"] = "Failed to save prediction"
+        
+        error_count = sum(1 for r in results if 'error' in r) + len(parse_errors)
+        response = {
+            "results": results,
+            "count": len(results),
+            "errors": error_count
+        }
+        if parse_errors:
+            response["parse_errors"] = parse_errors
+        return jsonify(response)
+    except HTTPException:
+        # e.g. 413 from the upload limits; let Flask answer with its status
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/analyze_health', methods=['POST'])
 def analyze_health_route():
+    # Reject oversized uploads from the header, before reading the body
+    # (allowing 64 KB for multipart boundaries and other form fields)
+    if request.content_length and request.content_length > Config.UPLOAD_MAX_FILE_BYTES + 64 * 1024:
+        return jsonify({"error": f"Image too large (max {Config.UPLOAD_MAX_FILE_BYTES} bytes)"}), 413
+    
     if 'image' not in request.files:
         return jsonify({"error": "No image uploaded"}), 400
     
     file = request.files['image']
+    
+    # Decode straight to model input size (JPEGs are decoded at reduced scale)
+    try:
+        thumbnail, original_size = load_thumbnail(file.stream, Config.HEALTH_IMAGE_SIZE)
+    except InvalidImage as e:
+        return jsonify({"error": str(e)}), 400
     # Placeholder for actual analysis
-    # In a real app, save file, run model.predict(image)
+    # In a real app, run model.predict(thumbnail)
     
     # Mock Response
     import random
@@ -154,7 +386,13 @@ def analyze_health_route():
         "status": status,
         "disease": "Leaf Blight" if status == "Infected" else None,
         "confidence": round(random.uniform(0.85, 0.99), 2),
-        "recommendations": []
+        "recommendations": [],
+        "image": {
+            "sha256": file.stream.sha256,
+            "bytes": file.stream.size,
+            "width": original_size[0],
+            "height": original_size[1]
+        }
     }
     
     if status == "Infected":
@@ -195,6 +433,59 @@ def gps_location_route():
         "state": state
     })
 
+@app.route('/api/location/bulk', methods=['POST'])
+def gps_location_bulk_route():
+    """
+    Resolve many GPS points to district/state in one request
+    
+    Request body:
+    {
+        "points": [[23.02, 72.57], {"lat": 21.17, "lon": 72.83}, ...]
+    }
+    
+    Response (application/x-ndjson, one line per point, in input order):
+    {"index": 0, "lat": 23.02, "lon": 72.57, "district": "Ahmadabad", "state": "Gujarat"}
+    {"index": 1, "error": "Invalid point (...)"}
+    """
+    data = request.get_json(silent=True)
+    raw_points = data.get("points") if isinstance(data, dict) else data
+    
+    if not isinstance(raw_points, list):
+        return jsonify({"error": "Expected {\"points\": [[lat, lon], ...]}"}), 400
+    
+    if len(raw_points) > Config.LOCATION_BULK_MAX_POINTS:
+        return jsonify({
+            "error": f"Too many points: {len(raw_points)} (max {Config.LOCATION_BULK_MAX_POINTS})"
+        }), 413
+    
+    # Normalise to (lat, lon); invalid or out-of-range entries are reported in place
+    points = _parse_points(raw_points)
+    
+    def generate():
+        chunk_size = Config.LOCATION_BULK_CHUNK_SIZE
+        for start in range(0, len(points), chunk_size):
+            chunk = points[start:start + chunk_size]
+            valid = [p for p in chunk if p is not None]
+            resolved = iter(get_districts_for_points(valid))
+            
+            lines = []
+            for offset, point in enumerate(chunk):
+                if point is None:
+                    row = {"index": start + offset, "error": INVALID_POINT}
+                else:
+                    location = next(resolved)
+                    row = {
+                        "index": start + offset,
+                        "lat": point[0],
+                        "lon": point[1],
+                        "district": location['district'],
+                        "state": location['state']
+                    }
+                lines.append(json.dumps(row))
+            yield "\n".join(lines) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/nutrient-comparison', methods=['POST'])
 def nutrient_comparison_route():
     """
@@ -206,10 +497,11 @@ def nutrient_comparison_route():
         "crop": "Wheat"
     }
     
-    Response:
+    Response (also sent as the X-Dataset-Version header):
     {
         "state": "Gujarat",
         "crop": "Wheat",
+        "dataset_version": "3f9c2a71b0de",
         "nutrient_comparison": [
             {
                 "nutrient": "Nitrogen",
@@ -236,6 +528,7 @@ def nutrient_comparison_route():
         
         # Call comparison function
         result = compare_nutrients(state, crop)
+        g.dataset_version = result.get('dataset_version')
         
         # Check if there was an error
         if 'error' in result:
@@ -246,5 +539,194 @@ def nutrient_comparison_route():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _list_arg(name):
+    """Collect a filter given as repeated and/or comma-separated query params"""
+    values = []
+    for raw in request.args.getlist(name):
+        values.extend(v.strip() for v in raw.split(',') if v.strip())
+    return values
+
+@app.route('/api/nutrient-comparison/matrix', methods=['GET'])
+def nutrient_comparison_matrix_route():
+    """
+    Full crop-by-state nutrient comparison in one request
+    
+    Query params (all optional, comma-separated or repeated):
+        state, crop, nutrient, status
+        format: json (default) or csv
+    
+    Example: /api/nutrient-comparison/matrix?state=Gujarat&crop=Wheat,Rice&format=csv
+    
+    Response (json):
+    {
+        "dataset_version": "3f9c2a71b0de",
+        "count": 6,
+        "rows": [
+            {"state": "Gujarat", "crop": "Rice", "nutrient": "Nitrogen",
+             "crop_required": 100, "state_available": 85.0,
+             "percentage": 85.0, "status": "Sufficient"},
+            ...
+        ]
+    }
+    """
+    output_format = request.args.get('format', 'json').lower()
+    if output_format not in ('json', 'csv'):
+        return jsonify({"error": "format must be 'json' or 'csv'"}), 400
+    
+    try:
+        matrix, g.dataset_version = get_comparison_matrix(
+            states=_list_arg('state'),
+            crops=_list_arg('crop'),
+            nutrients=_list_arg('nutrient'),
+            statuses=_list_arg('status')
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    
+    if output_format == 'json':
+        rows = matrix.to_dict(orient='records')
+        return jsonify({"dataset_version": g.dataset_version, "count": len(rows), "rows": rows}), 200
+    
+    def generate():
+        yield ",".join(MATRIX_COLUMNS) + "\n"
+        chunk_size = 1000
+        for start in range(0, len(matrix), chunk_size):
+            yield matrix.iloc[start:start + chunk_size].to_csv(index=False, header=False)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={"Content-Disposition": "attachment; filename=nutrient_comparison_matrix.csv"}
+    )
+
+@app.route('/api/recommend_fertilizer', methods=['POST'])
+def recommend_fertilizer_route():
+    """
+    Recommend a fertilizer from the k nearest rows of data_core.csv
+    
+    Request body (single):
+    {
+        "temperature": 26, "humidity": 52, "moisture": 38,
+        "N": 37, "K": 0, "P": 0,
+        "soil_type": "Sandy", "crop": "Maize"
+    }
+    
+    Batch: a JSON array, {"records": [...], ...shared fields}, or a CSV /
+    NDJSON body or 'file' upload with the same fields per record.
+    
+    Optional "k" (body or query string) sets how many neighbours vote.
+    
+    Response (single; batch returns {"results": [...], "count", "errors"}):
+    {
+        "fertilizer": "Urea",
+        "confidence": 0.8,
+        "votes": {"Urea": 4, "DAP": 1},
+        "neighbors": 5,
+        "nearest_distance": 0.0,
+        "partition": "sandy/maize",
+        "dataset_version": "3f9c2a71b0de"
+    }
+    """
+    payload = request.get_json(silent=True)
+    single = isinstance(payload, dict) and 'records' not in payload
+    
+    try:
+        if single:
+            records, defaults = [payload], {}
+        else:
+            try:
+                records, defaults, parse_errors = parse_batch_records(request)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            if len(records) > Config.BATCH_MAX_ROWS:
+                return jsonify({
+                    "error": f"Batch too large: {len(records)} records (max {Config.BATCH_MAX_ROWS})"
+                }), 413
+        
+        k = request.args.get('k') or (payload.get('k') if isinstance(payload, dict) else None) or Config.FERTILIZER_NEIGHBORS
+        try:
+            k = int(k)
+        except (TypeError, ValueError):
+            return jsonify({"error": "'k' must be an integer"}), 400
+        if not 1 <= k <= Config.FERTILIZER_MAX_NEIGHBORS:
+            return jsonify({"error": f"'k' must be between 1 and {Config.FERTILIZER_MAX_NEIGHBORS}"}), 400
+        
+        rows = []
+        for record in records:
+            row = dict(defaults)
+            if isinstance(record, dict):
+                row.update(record)
+            rows.append(row)
+        
+        results, g.dataset_version = recommend_fertilizer(rows, k)
+        
+        if single:
+            result = results[0]
+            if 'error' in result:
+                return jsonify(result), 400
+            result['dataset_version'] = g.dataset_version
+            return jsonify(result), 200
+        
+        for index, (record, result) in enumerate(zip(records, results)):
+            if not isinstance(record, dict):
+                result = {"error": "Record must be an object"}
+            result['index'] = index
+            results[index] = result
+        
+        error_count = sum(1 for r in results if 'error' in r) + len(parse_errors)
+        response = {
+            "dataset_version": g.dataset_version,
+            "results": results,
+            "count": len(results),
+            "errors": error_count
+        }
+        if parse_errors:
+            response["parse_errors"] = parse_errors
+        return jsonify(response)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_route():
+    """
+    Readiness check: database reachable and schema up to date
+
+    Read-only: reports the schema version and never runs migrations.
+    """
+    status = get_schema_status()
+    if status["ready"]:
+        return jsonify({
+            "status": "ready",
+            "schema_version": status["version"],
+            "migration_pending": status["migration_pending"]
+        }), 200
+    return jsonify({
+        "status": "unavailable",
+        "schema_version": status["version"],
+        "expected_schema_version": status["expected"],
+        "error": status["error"]
+    }), 503
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_route():
+    """
+    Runtime metrics for this worker process
+    """
+    return jsonify({
+        "yield_model": get_model_stats(),
+        "yield_batcher": get_batcher_stats(),
+        "location": get_location_stats(),
+        "db_pools": get_pool_stats(),
+        "db_queries": get_query_stats(),
+        "prediction_writer": prediction_writer.stats() if prediction_writer is not None else None,
+        "reference_data": get_reference_data().stats(),
+        "weather": get_weather_service().stats(),
+        "http_clients": get_http_stats()
+    })
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -1,70 +1,99 @@
+import base64
+import json
+from datetime import datetime
 import mysql.connector
 from mysql.connector import Error
+from db import get_db_connection as _checkout_connection, run_prepared, timed_query
+from db_pool import PoolTimeout
 
-# Database configuration
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': 'MySql@1546',
-    'database': 'crop_yield'
-}
+
+class PredictionDataError(ValueError):
+    """Raised when MySQL rejects prediction data (constraint or data errors)"""
+
+
+# Columns returned by the prediction history queries
+PREDICTION_COLUMNS = (
+    "id, user_email, crop, soil_type, season, area, N, P, K, ph, state, "
+    "predicted_yield, total_yield, created_at"
+)
+
+# Hot queries, executed as cached server-side prepared statements
+USER_BY_EMAIL_QUERY = "SELECT id, name, email, password, created_at FROM users WHERE email = %s"
+
+INSERT_PREDICTION_QUERY = """
+INSERT INTO predictions (
+    user_email, crop, soil_type, season, area,
+    N, P, K, ph, state, predicted_yield, total_yield
+)
+SELECT email, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+FROM users WHERE email = %s
+"""
+
+HISTORY_OFFSET_QUERY = f"""
+SELECT {PREDICTION_COLUMNS} FROM predictions
+WHERE user_email = %s
+ORDER BY created_at DESC, id DESC
+LIMIT %s OFFSET %s
+"""
+
+HISTORY_FIRST_PAGE_QUERY = f"""
+SELECT {PREDICTION_COLUMNS} FROM predictions
+WHERE user_email = %s
+ORDER BY created_at DESC, id DESC
+LIMIT %s
+"""
+
+HISTORY_AFTER_CURSOR_QUERY = f"""
+SELECT {PREDICTION_COLUMNS} FROM predictions
+WHERE user_email = %s
+  AND (created_at < %s OR (created_at = %s AND id < %s))
+ORDER BY created_at DESC, id DESC
+LIMIT %s
+"""
+
+PREDICTION_COUNT_QUERY = (
+    "SELECT COALESCE(SUM(prediction_count), 0) AS count FROM prediction_summaries WHERE user_email = %s"
+)
+
+SUMMARY_ROWS_QUERY = """
+SELECT crop, prediction_count, total_predicted_yield, last_prediction_at
+FROM prediction_summaries
+WHERE user_email = %s
+ORDER BY last_prediction_at DESC
+"""
+
+# Incremental per-user, per-crop totals kept in step with the predictions table
+SUMMARY_UPSERT_QUERY = """
+INSERT INTO prediction_summaries (
+    user_email, crop, prediction_count, total_predicted_yield, last_prediction_at
+) VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+ON DUPLICATE KEY UPDATE
+    prediction_count = prediction_count + VALUES(prediction_count),
+    total_predicted_yield = total_predicted_yield + VALUES(total_predicted_yield),
+    last_prediction_at = VALUES(last_prediction_at)
+"""
+
+def _summary_rows(records):
+    """
+    Aggregate (user_email, prediction_data) records into summary upsert rows
+    Returns a list of (user_email, crop, count, total_predicted_yield)
+    """
+    totals = {}
+    for user_email, prediction_data in records:
+        key = (user_email.lower(), prediction_data.get('crop'))
+        count, total = totals.get(key, (0, 0.0))
+        totals[key] = (count + 1, total + float(prediction_data.get('predicted_yield') or 0))
+    return [(email, crop, count, round(total, 2)) for (email, crop), (count, total) in totals.items()]
 
 def get_db_connection():
-    """Create and return a database connection"""
+    """Check out a pooled connection, or None if the database is unreachable"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        if connection.is_connected():
-            return connection
-    except Error as e:
+        return _checkout_connection()
+    except (Error, PoolTimeout) as e:
+        # Error includes db.SchemaNotReady (schema behind or check failing)
         print(f"Error connecting to MySQL database: {e}")
         return None
 
-def init_auth_db():
-    """Initialize the authentication database and create users table"""
-    connection = None
-    cursor = None
-    
-    try:
-        connection = get_db_connection()
-        if not connection:
-            print("Failed to connect to database")
-            return False
-        
-        cursor = connection.cursor()
-        
-        # Create users table with single-user constraint
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS users (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            email VARCHAR(255) NOT NULL UNIQUE,
-            password VARCHAR(255) NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-        
-        cursor.execute(create_table_query)
-        connection.commit()
-        
-        print("[SUCCESS] Auth database initialized successfully")
-        
-        # Also initialize predictions table
-        cursor.close()
-        connection.close()
-        init_predictions_table()
-        
-        return True
-        
-    except Error as e:
-        print(f"[ERROR] Error initializing auth database: {e}")
-        return False
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
-
 def create_user(name, email, password):
     """
     Create a new user in the database
@@ -87,8 +116,9 @@ def create_user(name, email, password):
         VALUES (%s, %s, %s)
         """
         
-        cursor.execute(insert_query, (name, email.lower(), password))
-        connection.commit()
+        with timed_query('create_user'):
+            cursor.execute(insert_query, (name, email.lower(), password))
+            connection.commit()
         
         user_id = cursor.lastrowid
         print(f"[SUCCESS] User created successfully with ID: {user_id}")
@@ -115,28 +145,19 @@ def get_user_by_email(email):
     Returns user dict or None if not found
     """
     connection = None
-    cursor = None
     
     try:
         connection = get_db_connection()
         if not connection:
             return None
         
-        cursor = connection.cursor(dictionary=True)
-        
-        query = "SELECT * FROM users WHERE email = %s"
-        cursor.execute(query, (email.lower(),))
-        
-        user = cursor.fetchone()
-        return user
+        return run_prepared(connection, 'user_by_email', USER_BY_EMAIL_QUERY, (email.lower(),), fetch='one')
         
     except Error as e:
         print(f"Error getting user by email: {e}")
         return None
         
     finally:
-        if cursor:
-            cursor.close()
         if connection and connection.is_connected():
             connection.close()
 
@@ -147,57 +168,6 @@ def verify_password(plain_password, stored_password):
     """
     return plain_password == stored_password
 
-def init_predictions_table():
-    """Initialize the predictions table"""
-    connection = None
-    cursor = None
-    
-    try:
-        connection = get_db_connection()
-        if not connection:
-            print("Failed to connect to database")
-            return False
-        
-        cursor = connection.cursor()
-        
-        # Create predictions table
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS predictions (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            user_email VARCHAR(255) NOT NULL,
-            crop VARCHAR(100) NOT NULL,
-            soil_type VARCHAR(100),
-            season VARCHAR(50),
-            area DECIMAL(10,2),
-            N DECIMAL(10,2),
-            P DECIMAL(10,2),
-            K DECIMAL(10,2),
-            ph DECIMAL(4,2),
-            state VARCHAR(100),
-            predicted_yield DECIMAL(10,2),
-            total_yield DECIMAL(10,2),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_email) REFERENCES users(email) ON DELETE CASCADE,
-            INDEX idx_user_email (user_email)
-        )
-        """
-        
-        cursor.execute(create_table_query)
-        connection.commit()
-        
-        print("[SUCCESS] Predictions table initialized successfully")
-        return True
-        
-    except Error as e:
-        print(f"[ERROR] Error initializing predictions table: {e}")
-        return False
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
-
 def save_prediction(user_email, prediction_data):
     """
     Save a prediction to the database
@@ -210,30 +180,15 @@ def save_prediction(user_email, prediction_data):
         prediction_id on success, None on failure
     """
     connection = None
-    cursor = None
     
     try:
-        # Verify user exists
-        user = get_user_by_email(user_email)
-        if not user:
-            raise ValueError(f"User with email {user_email} does not exist")
-        
         connection = get_db_connection()
         if not connection:
             raise Exception("Failed to connect to database")
         
-        cursor = connection.cursor()
-        
-        # Insert prediction
-        insert_query = """
-        INSERT INTO predictions (
-            user_email, crop, soil_type, season, area,
-            N, P, K, ph, state, predicted_yield, total_yield
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
+        # Insert prediction; selecting from users validates the user in the
+        # same statement (no row is inserted if the email is unknown)
         values = (
-            user_email,
             prediction_data.get('crop'),
             prediction_data.get('soil_type'),
             prediction_data.get('season'),
@@ -244,23 +199,34 @@ def save_prediction(user_email, prediction_data):
             prediction_data.get('ph'),
             prediction_data.get('state'),
             prediction_data.get('predicted_yield'),
-            prediction_data.get('total_yield')
+            prediction_data.get('total_yield'),
+            user_email.lower()
         )
         
-        cursor.execute(insert_query, values)
+        rowcount, prediction_id = run_prepared(connection, 'insert_prediction', INSERT_PREDICTION_QUERY, values)
+        if rowcount == 0:
+            raise ValueError(f"User with email {user_email} does not exist")
+        
+        # Keep the summary in the same transaction as the insert
+        run_prepared(connection, 'upsert_summary', SUMMARY_UPSERT_QUERY,
+                     _summary_rows([(user_email, prediction_data)])[0])
         connection.commit()
         
-        prediction_id = cursor.lastrowid
         print(f"[SUCCESS] Prediction saved with ID: {prediction_id}")
         return prediction_id
         
+    except mysql.connector.IntegrityError as e:
+        # FK violation: the user was deleted between the SELECT and the INSERT
+        if e.errno == 1452:
+            raise ValueError(f"User with email {user_email} does not exist")
+        print(f"Error saving prediction: {e}")
+        raise Exception(f"Database error: {str(e)}")
+        
     except Error as e:
         print(f"Error saving prediction: {e}")
         raise Exception(f"Database error: {str(e)}")
         
     finally:
-        if cursor:
-            cursor.close()
         if connection and connection.is_connected():
             connection.close()
 
@@ -277,34 +243,90 @@ def get_user_predictions(user_email, limit=10, offset=0):
         List of prediction dicts
     """
     connection = None
-    cursor = None
     
     try:
         connection = get_db_connection()
         if not connection:
             return []
         
-        cursor = connection.cursor(dictionary=True)
+        return run_prepared(connection, 'history_offset', HISTORY_OFFSET_QUERY,
+                            (user_email, limit, offset), fetch='all')
         
-        query = """
-        SELECT * FROM predictions 
-        WHERE user_email = %s 
-        ORDER BY created_at DESC 
-        LIMIT %s OFFSET %s
-        """
-        
-        cursor.execute(query, (user_email, limit, offset))
-        predictions = cursor.fetchall()
+    except Error as e:
+        print(f"Error getting user predictions: {e}")
+        return []
         
-        return predictions
+    finally:
+        if connection and connection.is_connected():
+            connection.close()
+
+def encode_history_cursor(created_at, prediction_id):
+    """Build an opaque cursor pointing just after (created_at, id)"""
+    raw = json.dumps([created_at.isoformat(), prediction_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_history_cursor(cursor):
+    """
+    Decode a cursor from encode_history_cursor
+    Raises ValueError if it is malformed
+    """
+    try:
+        created_at, prediction_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(prediction_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+def get_user_predictions_page(user_email, limit=10, cursor=None):
+    """
+    Get one page of a user's predictions using keyset pagination
+    
+    Args:
+        user_email: User's email address
+        limit: Maximum number of predictions to return
+        cursor: Opaque cursor from a previous page (None for the first page)
+    
+    Returns:
+        (predictions, next_cursor) - next_cursor is None on the last page
+    
+    Raises:
+        ValueError if the cursor is malformed
+    """
+    after = decode_history_cursor(cursor) if cursor else None
+    
+    connection = None
+    
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return [], None
+        
+        # Seeks straight to the page on idx_user_created instead of
+        # scanning and discarding OFFSET rows
+        if after:
+            predictions = run_prepared(
+                connection, 'history_after_cursor', HISTORY_AFTER_CURSOR_QUERY,
+                (user_email, after[0], after[0], after[1], limit + 1), fetch='all'
+            )
+        else:
+            predictions = run_prepared(
+                connection, 'history_first_page', HISTORY_FIRST_PAGE_QUERY,
+                (user_email, limit + 1), fetch='all'
+            )
+        
+        # One extra row tells us whether another page exists
+        next_cursor = None
+        if len(predictions) > limit:
+            predictions = predictions[:limit]
+            last = predictions[-1]
+            next_cursor = encode_history_cursor(last['created_at'], last['id'])
+        
+        return predictions, next_cursor
         
     except Error as e:
         print(f"Error getting user predictions: {e}")
-        return []
+        return [], None
         
     finally:
-        if cursor:
-            cursor.close()
         if connection and connection.is_connected():
             connection.close()
 
@@ -319,28 +341,158 @@ def get_prediction_count(user_email):
         Count of predictions
     """
     connection = None
-    cursor = None
     
     try:
         connection = get_db_connection()
         if not connection:
             return 0
         
+        # Primary-key lookup on the summary table instead of COUNT(*)
+        result = run_prepared(connection, 'prediction_count', PREDICTION_COUNT_QUERY, (user_email,), fetch='one')
+        return int(result['count']) if result else 0
+        
+    except Error as e:
+        print(f"Error getting prediction count: {e}")
+        return 0
+        
+    finally:
+        if connection and connection.is_connected():
+            connection.close()
+
+def get_prediction_summary(user_email):
+    """
+    Get dashboard totals for a user from the summary table
+    
+    Args:
+        user_email: User's email address
+    
+    Returns:
+        Dict with total count, last prediction and per-crop averages
+    """
+    connection = None
+    
+    summary = {
+        'count': 0,
+        'last_prediction': None,
+        'crops': []
+    }
+    
+    try:
+        connection = get_db_connection()
+        if not connection:
+            return summary
+        
+        rows = run_prepared(connection, 'summary_rows', SUMMARY_ROWS_QUERY, (user_email,), fetch='all')
+        for row in rows:
+            count = int(row['prediction_count'])
+            summary['count'] += count
+            summary['crops'].append({
+                'crop': row['crop'],
+                'count': count,
+                'average_predicted_yield': round(float(row['total_predicted_yield']) / count, 2) if count else 0,
+                'last_prediction_at': row['last_prediction_at']
+            })
+        
+        if summary['count']:
+            # Single index seek on idx_user_created
+            summary['last_prediction'] = run_prepared(
+                connection, 'history_first_page', HISTORY_FIRST_PAGE_QUERY, (user_email, 1), fetch='one'
+            )
+        
+        return summary
+        
+    except Error as e:
+        print(f"Error getting prediction summary: {e}")
+        return summary
+        
+    finally:
+        if connection and connection.is_connected():
+            connection.close()
+
+def save_predictions_bulk(records):
+    """
+    Save many predictions in one round-trip
+    
+    Args:
+        records: List of (user_email, prediction_data) tuples
+    
+    Returns:
+        List of booleans, one per record: True if saved, False if the
+        user does not exist
+    """
+    if not records:
+        return []
+    
+    connection = None
+    cursor = None
+    
+    try:
+        connection = get_db_connection()
+        if not connection:
+            raise Exception("Failed to connect to database")
+        
         cursor = connection.cursor()
         
-        query = "SELECT COUNT(*) FROM predictions WHERE user_email = %s"
-        cursor.execute(query, (user_email,))
+        # Verify all referenced users with a single query
+        emails = sorted({email.lower() for email, _ in records})
+        placeholders = ", ".join(["%s"] * len(emails))
+        with timed_query('bulk_user_lookup'):
+            cursor.execute(f"SELECT email FROM users WHERE email IN ({placeholders})", emails)
+            known_emails = {row[0].lower() for row in cursor.fetchall()}
+        
+        saved = [email.lower() in known_emails for email, _ in records]
         
-        result = cursor.fetchone()
-        return result[0] if result else 0
+        insert_query = """
+        INSERT INTO predictions (
+            user_email, crop, soil_type, season, area,
+            N, P, K, ph, state, predicted_yield, total_yield
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        
+        values = [
+            (
+                user_email,
+                prediction_data.get('crop'),
+                prediction_data.get('soil_type'),
+                prediction_data.get('season'),
+                prediction_data.get('area'),
+                prediction_data.get('N'),
+                prediction_data.get('P'),
+                prediction_data.get('K'),
+                prediction_data.get('ph'),
+                prediction_data.get('state'),
+                prediction_data.get('predicted_yield'),
+                prediction_data.get('total_yield')
+            )
+            for (user_email, prediction_data), ok in zip(records, saved)
+            if ok
+        ]
+        
+        if values:
+            # executemany rewrites this into a multi-row INSERT, so it uses a
+            # regular cursor rather than a prepared statement
+            with timed_query('bulk_insert_predictions'):
+                cursor.executemany(insert_query, values)
+                
+                # Keep the summaries in the same transaction as the inserts
+                summary_rows = _summary_rows([r for r, ok in zip(records, saved) if ok])
+                cursor.executemany(SUMMARY_UPSERT_QUERY, summary_rows)
+                connection.commit()
+        
+        print(f"[SUCCESS] Saved {len(values)} of {len(records)} predictions")
+        return saved
+        
+    except (mysql.connector.errors.DataError, mysql.connector.errors.IntegrityError) as e:
+        # A record MySQL rejects (e.g. missing crop); retrying it won't help
+        print(f"Error saving predictions: {e}")
+        raise PredictionDataError(f"Database error: {str(e)}")
         
     except Error as e:
-        print(f"Error getting prediction count: {e}")
-        return 0
+        print(f"Error saving predictions: {e}")
+        raise Exception(f"Database error: {str(e)}")
         
     finally:
         if cursor:
             cursor.close()
         if connection and connection.is_connected():
             connection.close()
-
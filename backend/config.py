@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 class Config:
     """Application configuration from environment variables"""
     
@@ -12,8 +14,97 @@ class Config:
     MYSQL_PORT = int(os.getenv('MYSQL_PORT', 3306))
     MYSQL_USER = os.getenv('MYSQL_USER', 'root')
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', '')
-    MYSQL_DATABASE = os.getenv('MYSQL_DATABASE', 'smart_agriculture')
+    MYSQL_DATABASE = os.getenv('MYSQL_DATABASE', 'crop_yield')
+    
+    # Run schema migrations lazily on first use if the database is behind;
+    # turn off in production and run `python db.py migrate` at deploy time
+    DB_AUTO_MIGRATE = os.getenv('DB_AUTO_MIGRATE', 'true').lower() in ('1', 'true', 'yes')
+    # After a failed schema check, fail fast for this long before checking again
+    DB_SCHEMA_RETRY_INTERVAL = float(os.getenv('DB_SCHEMA_RETRY_INTERVAL', 5))   # seconds
+    
+    # Connection pool settings
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', 10))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 3600))   # seconds, 0 = never
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))   # seconds to wait for a connection
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
     
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'default-secret-key-change-in-production')
     JWT_ACCESS_TOKEN_EXPIRES = 86400  # 24 hours in seconds
+    
+    # Batch prediction limits
+    BATCH_MAX_ROWS = int(os.getenv('BATCH_MAX_ROWS', 5000))
+    
+    # Write-behind persistence of prediction history
+    PREDICTION_WRITE_BEHIND = os.getenv('PREDICTION_WRITE_BEHIND', 'true').lower() in ('1', 'true', 'yes')
+    PREDICTION_QUEUE_SIZE = int(os.getenv('PREDICTION_QUEUE_SIZE', 10000))
+    PREDICTION_BATCH_SIZE = int(os.getenv('PREDICTION_BATCH_SIZE', 200))
+    PREDICTION_FLUSH_INTERVAL = float(os.getenv('PREDICTION_FLUSH_INTERVAL', 1.0))  # seconds
+    # fsync the journal on every prediction (survives host crashes, costs a disk sync per request)
+    PREDICTION_JOURNAL_FSYNC = os.getenv('PREDICTION_JOURNAL_FSYNC', 'false').lower() in ('1', 'true', 'yes')
+    PREDICTION_SPILL_DIR = os.getenv('PREDICTION_SPILL_DIR', os.path.join(BASE_DIR, 'cache', 'prediction_spool'))
+    
+    # Micro-batching of concurrent single-row yield predictions
+    YIELD_BATCHING_ENABLED = os.getenv('YIELD_BATCHING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    YIELD_BATCH_WINDOW_MS = float(os.getenv('YIELD_BATCH_WINDOW_MS', 2))
+    YIELD_BATCH_MAX_ROWS = int(os.getenv('YIELD_BATCH_MAX_ROWS', 64))
+    
+    # District boundaries and their pre-serialized binary cache
+    DISTRICTS_GEOJSON_PATH = os.getenv('DISTRICTS_GEOJSON_PATH', os.path.join(BASE_DIR, 'india_district.geojson'))
+    DISTRICTS_CACHE_PATH = os.getenv('DISTRICTS_CACHE_PATH', os.path.join(BASE_DIR, 'cache', 'india_district.wkb.pkl'))
+    
+    # Simplification tolerance (degrees) for the fast point-in-district test;
+    # 0 disables it and uses the full-resolution polygons only
+    LOCATION_SIMPLIFY_TOLERANCE = float(os.getenv('LOCATION_SIMPLIFY_TOLERANCE', 0.001))
+    
+    # Optional raster grid for O(1) GPS-to-district lookup
+    LOCATION_GRID_ENABLED = os.getenv('LOCATION_GRID_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    LOCATION_GRID_RESOLUTION = float(os.getenv('LOCATION_GRID_RESOLUTION', 0.01))  # degrees per cell
+    LOCATION_GRID_PATH = os.getenv('LOCATION_GRID_PATH', os.path.join(BASE_DIR, 'cache', 'district_grid.npy'))
+    
+    # Cache for repeated /api/location coordinates
+    LOCATION_CACHE_SIZE = int(os.getenv('LOCATION_CACHE_SIZE', 10000))       # 0 disables the cache
+    LOCATION_CACHE_TTL = float(os.getenv('LOCATION_CACHE_TTL', 3600))        # seconds, 0 = no expiry
+    LOCATION_CACHE_PRECISION = int(os.getenv('LOCATION_CACHE_PRECISION', 4)) # decimal places (~11 m)
+    
+    # Bulk reverse geocoding
+    LOCATION_BULK_MAX_POINTS = int(os.getenv('LOCATION_BULK_MAX_POINTS', 100000))
+    LOCATION_BULK_CHUNK_SIZE = int(os.getenv('LOCATION_BULK_CHUNK_SIZE', 5000))
+    
+    # Reference datasets under data/ (soil, crop needs, ...) are reloaded
+    # when their files change, without restarting workers
+    REFERENCE_DATA_DIR = os.getenv('REFERENCE_DATA_DIR', os.path.join(BASE_DIR, 'data'))
+    REFERENCE_DATA_WATCH = os.getenv('REFERENCE_DATA_WATCH', 'true').lower() in ('1', 'true', 'yes')
+    REFERENCE_DATA_POLL_INTERVAL = float(os.getenv('REFERENCE_DATA_POLL_INTERVAL', 5))  # seconds
+    
+    # Fertilizer recommendation (k-nearest neighbours over data/data_core.csv)
+    FERTILIZER_NEIGHBORS = int(os.getenv('FERTILIZER_NEIGHBORS', 5))
+    FERTILIZER_MAX_NEIGHBORS = int(os.getenv('FERTILIZER_MAX_NEIGHBORS', 50))
+    
+    # Weather provider ('stub' for local development/tests, or 'openweather')
+    WEATHER_PROVIDER = os.getenv('WEATHER_PROVIDER', 'stub')
+    OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY', '')
+    OPENWEATHER_BASE_URL = os.getenv('OPENWEATHER_BASE_URL', 'https://api.openweathermap.org')
+    WEATHER_TIMEOUT = float(os.getenv('WEATHER_TIMEOUT', 5))                      # read timeout, seconds
+    WEATHER_CONNECT_TIMEOUT = float(os.getenv('WEATHER_CONNECT_TIMEOUT', 3.05))   # seconds
+    
+    # Pooled keep-alive HTTP client for upstream weather calls
+    WEATHER_HTTP_POOL_SIZE = int(os.getenv('WEATHER_HTTP_POOL_SIZE', 10))         # keep-alive connections
+    WEATHER_HTTP_MAX_CONCURRENCY = int(os.getenv('WEATHER_HTTP_MAX_CONCURRENCY', 10))
+    WEATHER_HTTP_RETRIES = int(os.getenv('WEATHER_HTTP_RETRIES', 2))
+    WEATHER_HTTP_BACKOFF = float(os.getenv('WEATHER_HTTP_BACKOFF', 0.3))          # seconds, doubles per retry
+    WEATHER_BULK_MAX_POINTS = int(os.getenv('WEATHER_BULK_MAX_POINTS', 1000))
+    
+    # Weather cache: geohash cell x time bucket, with stale-while-revalidate
+    WEATHER_GEOHASH_PRECISION = int(os.getenv('WEATHER_GEOHASH_PRECISION', 5))    # ~4.9 km cells
+    WEATHER_CACHE_TTL = float(os.getenv('WEATHER_CACHE_TTL', 600))                # seconds per time bucket
+    WEATHER_STALE_TTL = float(os.getenv('WEATHER_STALE_TTL', 1800))               # seconds stale values may be served
+    WEATHER_CACHE_SIZE = int(os.getenv('WEATHER_CACHE_SIZE', 10000))
+    
+    # Request body and upload limits
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 32 * 1024 * 1024))          # whole request, bytes
+    UPLOAD_MAX_FILE_BYTES = int(os.getenv('UPLOAD_MAX_FILE_BYTES', 10 * 1024 * 1024))    # per uploaded file
+    UPLOAD_SPOOL_SIZE = int(os.getenv('UPLOAD_SPOOL_SIZE', 512 * 1024))                  # kept in memory before spilling to disk
+    UPLOAD_MAX_PIXELS = int(os.getenv('UPLOAD_MAX_PIXELS', 50_000_000))                  # reject larger images before decoding
+    HEALTH_IMAGE_SIZE = int(os.getenv('HEALTH_IMAGE_SIZE', 224))                         # thumbnail side fed to the health model
@@ -1,91 +1,401 @@
-import pymysql
-from pymysql.cursors import DictCursor
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import Error
 from config import Config
+from db_pool import ConnectionPool
+
+def _connect(with_database=True):
+    """Open a new raw database connection"""
+    params = {
+        'host': Config.MYSQL_HOST,
+        'port': Config.MYSQL_PORT,
+        'user': Config.MYSQL_USER,
+        'password': Config.MYSQL_PASSWORD,
+        'autocommit': False
+    }
+    if with_database:
+        params['database'] = Config.MYSQL_DATABASE
+    return mysql.connector.connect(**params)
+
+pool = ConnectionPool(
+    'mysql',
+    _connect,
+    size=Config.DB_POOL_SIZE,
+    max_overflow=Config.DB_POOL_MAX_OVERFLOW,
+    recycle=Config.DB_POOL_RECYCLE,
+    pre_ping=Config.DB_POOL_PRE_PING,
+    timeout=Config.DB_POOL_TIMEOUT
+)
+
+# Bump when init_db() gains new schema changes
+SCHEMA_VERSION = 1
+
+class SchemaNotReady(Error):
+    """
+    The schema check failed or the schema is behind. A mysql.connector
+    Error, so callers that handle an unreachable database handle this too.
+    """
+
+# Set once this process has seen an up-to-date schema
+_schema_ready = False
+_schema_lock = threading.Lock()
+# Last failed check: (monotonic time, error); cached for DB_SCHEMA_RETRY_INTERVAL
+_schema_failure = None
+
+# Per-query timing: name -> {'calls', 'total_ms', 'max_ms', 'errors'}
+_query_stats = {}
+_query_stats_lock = threading.Lock()
 
 def get_db_connection():
-    """Create and return a database connection"""
+    """Check out a pooled database connection (close() returns it to the pool)"""
     try:
-        connection = pymysql.connect(
-            host=Config.MYSQL_HOST,
-            port=Config.MYSQL_PORT,
-            user=Config.MYSQL_USER,
-            password=Config.MYSQL_PASSWORD,
-            database=Config.MYSQL_DATABASE,
-            cursorclass=DictCursor,
-            autocommit=False
-        )
-        return connection
-    except pymysql.err.OperationalError as e:
+        if not _schema_ready:
+            ensure_schema()
+        return pool.acquire()
+    except Error as e:
         print(f"Error connecting to MySQL: {e}")
         raise
 
+@contextmanager
+def timed_query(name):
+    """Record the duration of the wrapped query under `name`"""
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with _query_stats_lock:
+            stats = _query_stats.setdefault(name, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'errors': 0})
+            stats['calls'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            if failed:
+                stats['errors'] += 1
+
+def get_query_stats():
+    """Return per-query timing metrics"""
+    with _query_stats_lock:
+        result = {}
+        for name, stats in _query_stats.items():
+            result[name] = dict(stats)
+            result[name]['avg_ms'] = round(stats['total_ms'] / stats['calls'], 3) if stats['calls'] else 0
+            result[name]['total_ms'] = round(stats['total_ms'], 3)
+            result[name]['max_ms'] = round(stats['max_ms'], 3)
+    return result
+
+def _prepared_cursor(connection, query):
+    """
+    Return the server-side prepared statement for `query` on this connection,
+    preparing it on first use. Handles are cached for the connection's lifetime.
+    """
+    cursor = connection.statements.get(query)
+    if cursor is None:
+        cursor = connection.cursor(prepared=True)
+        connection.statements[query] = cursor
+    return cursor
+
+def run_prepared(connection, name, query, params=(), fetch=None):
+    """
+    Execute a hot query as a cached server-side prepared statement
+
+    Args:
+        connection: Pooled connection from get_db_connection()
+        name: Metrics name for the query
+        query: SQL with %s placeholders
+        params: Query parameters (tuple)
+        fetch: None, 'one' or 'all'
+
+    Returns:
+        fetch='one': dict or None
+        fetch='all': list of dicts
+        fetch=None: (rowcount, lastrowid)
+    """
+    with timed_query(name):
+        cursor = _prepared_cursor(connection, query)
+        cursor.execute(query, params)
+        if fetch is None:
+            return cursor.rowcount, cursor.lastrowid
+        # Always drain the result so the statement can be re-executed
+        rows = cursor.fetchall()
+        columns = cursor.column_names
+        rows = [dict(zip(columns, row)) for row in rows]
+        if fetch == 'one':
+            return rows[0] if rows else None
+        return rows
+
+def get_schema_version():
+    """
+    Return the schema version recorded in the database
+    (0 if the database or the schema_version table does not exist yet)
+    """
+    try:
+        connection = _connect()
+    except Error as e:
+        if e.errno == 1049:  # Unknown database
+            return 0
+        raise
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        row = cursor.fetchone()
+        cursor.close()
+        return row[0] or 0
+    except Error as e:
+        if e.errno == 1146:  # Table doesn't exist
+            return 0
+        raise
+    finally:
+        connection.close()
+
+def ensure_schema():
+    """
+    Lazy readiness check, run on the first database access of each process
+
+    A single SELECT confirms the schema is current. Only if it is behind
+    (and DB_AUTO_MIGRATE is on) does this process run init_db(); normally
+    the schema is bootstrapped once per deployment with `python db.py migrate`.
+
+    A failed check is remembered for DB_SCHEMA_RETRY_INTERVAL seconds, during
+    which callers fail immediately instead of queueing on the lock to open
+    their own connection (e.g. while MySQL is down).
+    """
+    global _schema_ready, _schema_failure
+    
+    _raise_recent_failure()
+    with _schema_lock:
+        if _schema_ready:
+            return
+        # Another thread may have failed while we waited for the lock
+        _raise_recent_failure()
+        try:
+            version = get_schema_version()
+            if version < SCHEMA_VERSION:
+                if not Config.DB_AUTO_MIGRATE:
+                    raise SchemaNotReady(
+                        msg=f"Database schema is at version {version}, expected {SCHEMA_VERSION}; "
+                        "run `python db.py migrate`"
+                    )
+                init_db()
+        except Exception as e:
+            _schema_failure = (time.monotonic(), e)
+            if isinstance(e, Error):
+                raise
+            raise SchemaNotReady(msg=str(e)) from e
+        _schema_failure = None
+        _schema_ready = True
+
+def _raise_recent_failure():
+    failure = _schema_failure
+    if failure is not None and time.monotonic() - failure[0] < Config.DB_SCHEMA_RETRY_INTERVAL:
+        raise SchemaNotReady(msg=f"Database not ready: {failure[1]}")
+
+def get_schema_status():
+    """
+    Read-only readiness check for /api/ready
+
+    Reports the schema version recorded in the database; never migrates.
+    With DB_AUTO_MIGRATE on, a schema that is behind still counts as ready
+    (the first database access migrates it), flagged as migration_pending.
+
+    Returns:
+        {"ready": bool, "version": int or None, "expected": SCHEMA_VERSION,
+         "migration_pending": bool, "error": str or None}
+    """
+    status = {"ready": False, "version": None, "expected": SCHEMA_VERSION, "migration_pending": False, "error": None}
+    if _schema_ready:
+        # Checked already in this process; schema versions only move forward
+        status.update(ready=True, version=SCHEMA_VERSION)
+        return status
+    try:
+        status['version'] = get_schema_version()
+    except Exception as e:
+        print(f"Database not ready: {e}")
+        status['error'] = str(e)
+        return status
+    if status['version'] >= SCHEMA_VERSION:
+        status['ready'] = True
+    elif Config.DB_AUTO_MIGRATE:
+        status['ready'] = status['migration_pending'] = True
+    else:
+        status['error'] = "schema out of date; run `python db.py migrate`"
+    return status
+
 def init_db():
-    """Initialize database and create tables if they don't exist"""
+    """
+    Initialize database and create tables if they don't exist
+
+    Runs under a MySQL named lock so concurrent workers don't race, and
+    records SCHEMA_VERSION when done. Safe to run repeatedly.
+    """
+    connection = None
     try:
         # First, connect without specifying database to create it if needed
-        connection = pymysql.connect(
-            host=Config.MYSQL_HOST,
-            port=Config.MYSQL_PORT,
-            user=Config.MYSQL_USER,
-            password=Config.MYSQL_PASSWORD,
-            cursorclass=DictCursor
+        connection = _connect(with_database=False)
+        cursor = connection.cursor()
+
+        cursor.execute("SELECT GET_LOCK('smart_agriculture_schema', 60)")
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+
+        # Create database if it doesn't exist
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {Config.MYSQL_DATABASE}")
+        cursor.execute(f"USE {Config.MYSQL_DATABASE}")
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        current = cursor.fetchone()[0] or 0
+        if current >= SCHEMA_VERSION:
+            # Another worker finished the migration while we waited
+            cursor.execute("SELECT RELEASE_LOCK('smart_agriculture_schema')")
+            cursor.fetchone()
+            cursor.close()
+            return
+
+        # Create users table
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
-        
-        with connection.cursor() as cursor:
-            # Create database if it doesn't exist
-            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {Config.MYSQL_DATABASE}")
-            cursor.execute(f"USE {Config.MYSQL_DATABASE}")
-            
-            # Create users table
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_email (email)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-            """
-            cursor.execute(create_table_query)
-            
+        """)
+
+        # Create predictions table
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_email VARCHAR(255) NOT NULL,
+            crop VARCHAR(100) NOT NULL,
+            soil_type VARCHAR(100),
+            season VARCHAR(50),
+            area DECIMAL(10,2),
+            N DECIMAL(10,2),
+            P DECIMAL(10,2),
+            K DECIMAL(10,2),
+            ph DECIMAL(4,2),
+            state VARCHAR(100),
+            predicted_yield DECIMAL(10,2),
+            total_yield DECIMAL(10,2),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_email) REFERENCES users(email) ON DELETE CASCADE,
+            INDEX idx_user_created (user_email, created_at, id)
+        )
+        """)
+
+        # Tables created before the composite index existed get it added here;
+        # it covers the history sort and keyset pagination
+        cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = 'predictions'
+          AND index_name = 'idx_user_created'
+        """)
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(
+                "ALTER TABLE predictions ADD INDEX idx_user_created (user_email, created_at, id)"
+            )
+
+        # Per-user, per-crop summary maintained on every insert
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS prediction_summaries (
+            user_email VARCHAR(255) NOT NULL,
+            crop VARCHAR(100) NOT NULL,
+            prediction_count INT NOT NULL DEFAULT 0,
+            total_predicted_yield DECIMAL(16,2) NOT NULL DEFAULT 0,
+            last_prediction_at TIMESTAMP NULL,
+            PRIMARY KEY (user_email, crop),
+            FOREIGN KEY (user_email) REFERENCES users(email) ON DELETE CASCADE
+        )
+        """)
+
+        # Backfill from existing history the first time the table is created
+        cursor.execute("SELECT COUNT(*) FROM prediction_summaries")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""
+            INSERT INTO prediction_summaries (
+                user_email, crop, prediction_count, total_predicted_yield, last_prediction_at
+            )
+            SELECT user_email, crop, COUNT(*), COALESCE(SUM(predicted_yield), 0), MAX(created_at)
+            FROM predictions
+            GROUP BY user_email, crop
+            """)
+
+        cursor.execute("INSERT IGNORE INTO schema_version (version) VALUES (%s)", (SCHEMA_VERSION,))
         connection.commit()
-        connection.close()
-        print("Database initialized successfully")
-        
+        cursor.execute("SELECT RELEASE_LOCK('smart_agriculture_schema')")
+        cursor.fetchone()
+        cursor.close()
+        print(f"Database initialized successfully (schema version {SCHEMA_VERSION})")
+
     except Exception as e:
         print(f"Error initializing database: {e}")
         raise
 
+    finally:
+        # Closing the session also releases the named lock
+        if connection:
+            connection.close()
+
 def execute_query(query, params=None, fetch_one=False, fetch_all=False):
     """
     Execute a database query with parameters
-    
+
     Args:
         query: SQL query string
         params: Query parameters (tuple or dict)
         fetch_one: Return single result
         fetch_all: Return all results
-    
+
     Returns:
         Query results or affected row count
     """
     connection = get_db_connection()
+    cursor = None
     try:
-        with connection.cursor() as cursor:
+        with timed_query('execute_query'):
+            # Buffered so fetch_one does not leave unread rows behind
+            cursor = connection.cursor(dictionary=True, buffered=True)
             cursor.execute(query, params or ())
-            
+
             if fetch_one:
                 result = cursor.fetchone()
             elif fetch_all:
                 result = cursor.fetchall()
             else:
                 result = cursor.rowcount
-            
+
             connection.commit()
             return result
     except Exception as e:
         connection.rollback()
         raise e
     finally:
+        if cursor:
+            cursor.close()
         connection.close()
+
+if __name__ == '__main__':
+    # python db.py migrate | status
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'migrate':
+        init_db()
+    elif command == 'status':
+        version = get_schema_version()
+        state = "up to date" if version >= SCHEMA_VERSION else "needs migration"
+        print(f"Schema version {version} (expected {SCHEMA_VERSION}): {state}")
+    else:
+        print("Usage: python db.py [migrate | status]")
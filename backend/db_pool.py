@@ -0,0 +1,194 @@
+"""
+Thread-safe MySQL connection pool used by db.py
+
+The pool is driver agnostic: it is given a `connect` callable and hands out
+PooledConnection proxies whose close() returns the connection to the pool
+instead of closing the socket, so existing try/finally blocks keep working.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+# All pools created in this process, for metrics
+_pools = {}
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+class PooledConnection:
+    """
+    Proxy around a driver connection; close() releases it to the pool
+
+    `statements` is a per-connection dict that lives as long as the
+    underlying connection, for caching prepared statement handles.
+    """
+
+    def __init__(self, pool, raw, created_at, statements):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self.statements = statements
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def is_connected(self):
+        # Checked out connections were health-checked on checkout; avoid a
+        # ping round-trip here (mysql.connector's is_connected() pings)
+        return not self._released
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._raw, self._created_at, self.statements)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of database connections
+
+    Args:
+        name: Pool name used in metrics
+        connect: Callable returning a new driver connection
+        size: Connections kept open when idle
+        max_overflow: Extra connections allowed under load, closed on release
+        recycle: Reconnect connections older than this many seconds (0 = never)
+        pre_ping: Ping connections on checkout and replace dead ones
+        timeout: Seconds to wait for a free connection before PoolTimeout
+    """
+
+    def __init__(self, name, connect, size=5, max_overflow=10, recycle=3600, pre_ping=True, timeout=30):
+        self.name = name
+        self._connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._reset()
+        _pools[name] = self
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = deque()   # (raw connection, created_at, statements)
+        self._open = 0         # idle + checked out
+        self._in_use = 0
+        self._stats = {
+            'checkouts': 0,
+            'connections_created': 0,
+            'recycled': 0,
+            'failed_pings': 0,
+            'timeouts': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0
+        }
+
+    def _new_connection(self):
+        raw = self._connect()
+        with self._cond:
+            self._stats['connections_created'] += 1
+        return raw, time.monotonic(), {}
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """Check out a healthy connection, waiting up to `timeout` seconds"""
+        start = time.monotonic()
+        with self._cond:
+            # Connections must not be shared with a forked child process
+            if self._pid != os.getpid():
+                self._reset()
+            while True:
+                if self._idle:
+                    raw, created_at, statements = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    raw = None
+                    break
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No connection available in pool '{self.name}' after {self.timeout}s")
+                self._cond.wait(remaining)
+            self._in_use += 1
+
+        try:
+            if raw is None:
+                raw, created_at, statements = self._new_connection()
+            elif self.recycle and time.monotonic() - created_at > self.recycle:
+                self._discard(raw)
+                raw, created_at, statements = self._new_connection()
+                with self._cond:
+                    self._stats['recycled'] += 1
+            elif self.pre_ping:
+                try:
+                    raw.ping(reconnect=False)
+                except Exception:
+                    self._discard(raw)
+                    raw, created_at, statements = self._new_connection()
+                    with self._cond:
+                        self._stats['failed_pings'] += 1
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        wait = time.monotonic() - start
+        with self._cond:
+            self._stats['checkouts'] += 1
+            self._stats['total_wait_seconds'] += wait
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], wait)
+        return PooledConnection(self, raw, created_at, statements)
+
+    def release(self, raw, created_at, statements):
+        """Return a connection to the pool (called by PooledConnection.close)"""
+        healthy = True
+        try:
+            # End any open transaction so the next user gets a fresh snapshot
+            raw.rollback()
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._in_use -= 1
+            if healthy and self._open <= self.size:
+                self._idle.append((raw, created_at, statements))
+            else:
+                self._open -= 1
+                self._discard(raw)
+            self._cond.notify()
+
+    def stats(self):
+        """Return pool utilization and wait-time metrics"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['in_use'] = self._in_use
+            stats['idle'] = len(self._idle)
+            stats['open'] = self._open
+        stats['size'] = self.size
+        stats['max_overflow'] = self.max_overflow
+        stats['utilization'] = round(stats['in_use'] / (self.size + self.max_overflow), 4)
+        stats['avg_wait_seconds'] = (
+            round(stats['total_wait_seconds'] / stats['checkouts'], 6) if stats['checkouts'] else 0
+        )
+        return stats
+
+
+def get_pool_stats():
+    """Return metrics for every pool in this process"""
+    return {name: pool.stats() for name, pool in _pools.items()}
@@ -0,0 +1,173 @@
+"""
+Shared HTTP client for outbound API calls (weather providers)
+
+One requests.Session per process keeps TLS connections alive in a bounded
+urllib3 pool, so upstream calls reuse connections instead of opening one
+per Flask request. Every call has connect/read timeouts, idempotent
+requests are retried with exponential backoff on connection errors and
+429/5xx responses (honouring Retry-After, capped at the read timeout so a
+request never sleeps for minutes), and a semaphore caps how many calls
+are in flight at once.
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class _BoundedRetry(Retry):
+    """
+    Retry that waits at most `retry_after_cap` seconds for a Retry-After
+    header (urllib3 otherwise allows up to 6 hours)
+    """
+
+    def __init__(self, *args, retry_after_cap=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_after_cap = retry_after_cap
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.retry_after_cap = self.retry_after_cap
+        return retry
+
+    def get_retry_after(self, response):
+        seconds = super().get_retry_after(response)
+        if seconds is not None and self.retry_after_cap is not None:
+            seconds = min(seconds, self.retry_after_cap)
+        return seconds
+
+
+class HTTPClient:
+    """
+    Connection-pooled, rate-bounded HTTP client
+
+    Args:
+        name: Client name used in metrics
+        pool_size: Keep-alive connections per host
+        max_concurrency: Calls allowed in flight at once (others wait)
+        connect_timeout, read_timeout: Seconds
+        retries: Retry attempts for connection errors and retryable statuses
+        backoff: Backoff factor; waits backoff * 2**(attempt - 1) seconds
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, name, pool_size=10, max_concurrency=10, connect_timeout=3.05,
+                 read_timeout=5.0, retries=2, backoff=0.3):
+        self.name = name
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._session = None
+        self._stats = {
+            'requests': 0,
+            'errors': 0,
+            'in_flight': 0,
+            'total_seconds': 0.0,
+            'max_seconds': 0.0,
+            'total_wait_seconds': 0.0
+        }
+
+    def _new_session(self):
+        retry = _BoundedRetry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+            # Same order as one attempt, so a caller's wait stays bounded
+            retry_after_cap=self.timeout[1]
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _get_session(self):
+        # Sockets must not be shared with a forked child process
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._session = self._new_session()
+                    self._slots = threading.BoundedSemaphore(self.max_concurrency)
+                    self._pid = os.getpid()
+        return self._session
+
+    def get_json(self, url, params=None):
+        """
+        GET a URL and decode its JSON body
+
+        Raises:
+            requests.RequestException on connection errors, timeouts and
+            non-2xx responses (after retries)
+        """
+        session = self._get_session()
+        slots = self._slots
+        wait_start = time.monotonic()
+        slots.acquire()
+        start = time.monotonic()
+        with self._lock:
+            self._stats['in_flight'] += 1
+            self._stats['total_wait_seconds'] += start - wait_start
+        failed = True
+        try:
+            response = session.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            payload = response.json()
+            failed = False
+            return payload
+        finally:
+            slots.release()
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self._stats['in_flight'] -= 1
+                self._stats['requests'] += 1
+                self._stats['total_seconds'] += elapsed
+                self._stats['max_seconds'] = max(self._stats['max_seconds'], elapsed)
+                if failed:
+                    self._stats['errors'] += 1
+
+    def stats(self):
+        """Return call counts and latency metrics"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['avg_seconds'] = round(stats['total_seconds'] / stats['requests'], 4) if stats['requests'] else 0
+        stats['total_seconds'] = round(stats['total_seconds'], 4)
+        stats['max_seconds'] = round(stats['max_seconds'], 4)
+        stats['total_wait_seconds'] = round(stats['total_wait_seconds'], 4)
+        stats['pool_size'] = self.pool_size
+        stats['max_concurrency'] = self.max_concurrency
+        return stats
+
+
+# All clients created in this process, for metrics
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_http_client(name, **kwargs):
+    """Return the process-wide client with this name, creating it on first use"""
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = _clients[name] = HTTPClient(name, **kwargs)
+    return client
+
+
+def get_http_stats():
+    """Return metrics for every client in this process"""
+    return {name: client.stats() for name, client in _clients.items()}
@@ -0,0 +1,513 @@
+"""
+Location Service
+Resolves GPS coordinates to district and state using india_district.geojson
+"""
+
+import json
+import math
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from shapely.geometry import Point
+
+from config import Config
+from utils.lru_cache import LRUCache
+
+# Bump when the layout of the pre-serialized districts cache changes
+DISTRICTS_CACHE_VERSION = 1
+
+# Raster grid cell values: 0 = outside every district, GRID_BOUNDARY = the
+# cell touches a district edge (exact test needed), otherwise district index + 1
+GRID_OUTSIDE = 0
+GRID_BOUNDARY = np.iinfo(np.uint16).max
+
+# District data, loaded lazily on first lookup (see _ensure_loaded)
+districts_gdf = None
+district_geoms = None
+district_tree = None
+district_names = None
+state_names = None
+districts_source = None   # [mtime_ns, size] of the GeoJSON the data came from
+_load_lock = threading.Lock()
+
+# Simplified fast-path shapes (only when LOCATION_SIMPLIFY_TOLERANCE > 0).
+# fast_inner is the simplified district shrunk by the tolerance and
+# fast_outer the simplified district grown by it: a point inside fast_inner
+# is certainly in the district, a point outside fast_outer certainly is not,
+# and only the band in between needs the full-resolution polygon.
+fast_inner = None
+fast_outer = None
+_lookup_stats = {
+    'fast_path_hits': 0,
+    'full_resolution_tests': 0
+}
+_stats_lock = threading.Lock()
+
+# Repeat lookups from the same field skip the geometry work entirely
+_location_cache = None
+if Config.LOCATION_CACHE_SIZE > 0:
+    _location_cache = LRUCache(
+        maxsize=Config.LOCATION_CACHE_SIZE,
+        ttl=Config.LOCATION_CACHE_TTL or None
+    )
+
+# Memory-mapped district grid (only when LOCATION_GRID_ENABLED)
+district_grid = None
+grid_meta = None
+
+
+def _file_signature(path):
+    """Return [mtime_ns, size] for path, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def build_districts_cache(geojson_path=None, cache_path=None):
+    """
+    Parse the GeoJSON once and write a binary cache of WKB geometries plus
+    the name columns, tagged with the GeoJSON's mtime and size
+    """
+    geojson_path = geojson_path or Config.DISTRICTS_GEOJSON_PATH
+    cache_path = cache_path or Config.DISTRICTS_CACHE_PATH
+
+    start = time.perf_counter()
+    gdf = gpd.read_file(geojson_path)
+    record = {
+        'version': DISTRICTS_CACHE_VERSION,
+        'source': _file_signature(geojson_path),
+        'crs': gdf.crs.to_wkt() if gdf.crs is not None else None,
+        'NAME_1': gdf["NAME_1"].tolist(),
+        'NAME_2': gdf["NAME_2"].tolist(),
+        'wkb': shapely.to_wkb(np.asarray(gdf.geometry.values, dtype=object)).tolist()
+    }
+
+    cache_dir = os.path.dirname(os.path.abspath(cache_path))
+    os.makedirs(cache_dir, exist_ok=True)
+    # Unique temp name: workers building at the same time don't share a
+    # file; the last os.replace wins
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=os.path.basename(cache_path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    print(f"Districts cache built from {geojson_path} in {time.perf_counter() - start:.2f}s -> {cache_path}")
+    return record
+
+
+def _read_districts_cache(cache_path, source):
+    """Return the cached record if it matches the GeoJSON on disk, else None"""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, 'rb') as f:
+            record = pickle.load(f)
+    except Exception as e:
+        print(f"Warning: Ignoring unreadable districts cache: {e}")
+        return None
+    if record.get('version') != DISTRICTS_CACHE_VERSION:
+        return None
+    # Without the GeoJSON (cache-only deployment) the cache is authoritative
+    if source is not None and record.get('source') != source:
+        return None
+    return record
+
+
+def _load_districts():
+    """Load district geometries from the binary cache, rebuilding it if stale"""
+    global districts_gdf, district_geoms, district_tree, district_names, state_names, districts_source
+    global fast_inner, fast_outer
+
+    start = time.perf_counter()
+    source = _file_signature(Config.DISTRICTS_GEOJSON_PATH)
+    record = _read_districts_cache(Config.DISTRICTS_CACHE_PATH, source)
+    if record is None:
+        if source is None:
+            raise FileNotFoundError(f"District GeoJSON not found: {Config.DISTRICTS_GEOJSON_PATH}")
+        record = build_districts_cache()
+
+    geoms = shapely.from_wkb(np.asarray(record['wkb'], dtype=object))
+    gdf = gpd.GeoDataFrame(
+        {'NAME_1': record['NAME_1'], 'NAME_2': record['NAME_2']},
+        geometry=geoms,
+        crs=record['crs']
+    )
+
+    # Spatial index over the district polygons (built once at load).
+    # STRtree narrows a point down to the few districts whose bounding box
+    # contains it; the prepared geometries make the exact test cheap.
+    # Simplified shapes have a bounding box inside the original one, so the
+    # tree over the full-resolution polygons serves both paths.
+    tree = shapely.STRtree(geoms)
+    tolerance = Config.LOCATION_SIMPLIFY_TOLERANCE
+    if tolerance > 0:
+        inner, outer = build_fast_path_geometries(geoms, tolerance)
+    else:
+        shapely.prepare(geoms)
+        inner = outer = None
+
+    # Plain lists so the request path does not touch pandas
+    district_names = list(record['NAME_2'])
+    state_names = list(record['NAME_1'])
+    district_geoms = geoms
+    district_tree = tree
+    districts_source = record['source']
+    fast_inner = inner
+    fast_outer = outer
+    districts_gdf = gdf
+
+    print(f"Districts loaded ({len(geoms)} polygons) in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    if Config.LOCATION_GRID_ENABLED:
+        # Never build here: this runs inside the first /api/location request
+        # of every worker, and rasterizing all districts takes minutes
+        try:
+            if not load_district_grid(Config.LOCATION_GRID_RESOLUTION, Config.LOCATION_GRID_PATH,
+                                      build_if_stale=False):
+                print("Warning: District grid missing or stale, using spatial index only; "
+                      "run `python location_service.py build-grid`")
+        except Exception as e:
+            print(f"Warning: District grid unavailable, using spatial index only: {e}")
+
+
+def build_fast_path_geometries(geoms, tolerance):
+    """
+    Build the prepared inner/outer fast-path shapes for each district
+
+    Each district is simplified with preserve_topology=True, so the result
+    stays a valid polygon within `tolerance` of the original outline. Mitred
+    buffers of +/- tolerance around it then bracket the original polygon
+    with few extra vertices.
+    """
+    simplified = shapely.simplify(geoms, tolerance, preserve_topology=True)
+    margin = tolerance * 1.001
+    inner = shapely.buffer(simplified, -margin, join_style='mitre')
+    outer = shapely.buffer(simplified, margin, join_style='mitre')
+    shapely.prepare(inner)
+    shapely.prepare(outer)
+    return inner, outer
+
+
+def _contains(idx, point):
+    """Exact point-in-district test, using the fast-path shapes when available"""
+    if fast_inner is not None:
+        if fast_inner[idx].contains(point):
+            result = True
+        elif not fast_outer[idx].contains(point):
+            result = False
+        else:
+            # Within the tolerance band of the edge: use full resolution
+            with _stats_lock:
+                _lookup_stats['full_resolution_tests'] += 1
+            return district_geoms[idx].contains(point)
+        with _stats_lock:
+            _lookup_stats['fast_path_hits'] += 1
+        return result
+    return district_geoms[idx].contains(point)
+
+
+def simplification_report(tolerance=None, samples=2000, seed=42):
+    """
+    Compare the simplified fast path against prepared full-resolution
+    polygons: vertex counts, WKB size and lookup time over random points
+    """
+    _ensure_loaded()
+    tolerance = tolerance if tolerance is not None else (Config.LOCATION_SIMPLIFY_TOLERANCE or 0.001)
+
+    # Independent copies so preparing them does not touch the live shapes
+    full = shapely.from_wkb(shapely.to_wkb(district_geoms))
+    shapely.prepare(full)
+    inner, outer = build_fast_path_geometries(full, tolerance)
+
+    rng = np.random.default_rng(seed)
+    minx, miny, maxx, maxy = shapely.total_bounds(full)
+    points = shapely.points(rng.uniform(minx, maxx, samples), rng.uniform(miny, maxy, samples))
+    candidates = [sorted(district_tree.query(p)) for p in points]
+
+    start = time.perf_counter()
+    expected = []
+    for point, idxs in zip(points, candidates):
+        expected.append(next((i for i in idxs if full[i].contains(point)), None))
+    full_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = []
+    fallbacks = 0
+    for point, idxs in zip(points, candidates):
+        found = None
+        for i in idxs:
+            if inner[i].contains(point):
+                found = i
+                break
+            if outer[i].contains(point):
+                fallbacks += 1
+                if full[i].contains(point):
+                    found = i
+                    break
+        actual.append(found)
+    fast_seconds = time.perf_counter() - start
+
+    full_vertices = int(shapely.get_num_coordinates(full).sum())
+    fast_vertices = int(shapely.get_num_coordinates(inner).sum() + shapely.get_num_coordinates(outer).sum())
+    full_bytes = int(sum(len(b) for b in shapely.to_wkb(full)))
+    fast_bytes = int(sum(len(b) for b in shapely.to_wkb(inner)) + sum(len(b) for b in shapely.to_wkb(outer)))
+
+    return {
+        'tolerance': tolerance,
+        'samples': samples,
+        'full_vertices': full_vertices,
+        'fast_path_vertices': fast_vertices,
+        'full_wkb_bytes': full_bytes,
+        'fast_path_wkb_bytes': fast_bytes,
+        'wkb_bytes_saved': full_bytes - fast_bytes,
+        'full_lookup_us': round(full_seconds / samples * 1e6, 2),
+        'fast_lookup_us': round(fast_seconds / samples * 1e6, 2),
+        'speedup': round(full_seconds / fast_seconds, 2) if fast_seconds else None,
+        'full_resolution_fallbacks': fallbacks,
+        'mismatches': sum(1 for a, b in zip(expected, actual) if a != b)
+    }
+
+
+def get_location_stats():
+    """Return lookup counters for the location service"""
+    with _stats_lock:
+        stats = dict(_lookup_stats)
+    stats['loaded'] = districts_gdf is not None
+    stats['simplify_tolerance'] = Config.LOCATION_SIMPLIFY_TOLERANCE
+    stats['grid_enabled'] = district_grid is not None
+    stats['cache'] = _location_cache.stats() if _location_cache is not None else None
+    return stats
+
+
+def _ensure_loaded():
+    """Load the district data on first use (thread-safe)"""
+    if districts_gdf is not None:
+        return
+    with _load_lock:
+        if districts_gdf is None:
+            _load_districts()
+
+
+def build_district_grid(resolution, path):
+    """
+    Rasterize the district polygons into a uint16 grid saved as .npy
+
+    Each cell is the district index + 1 if the cell lies strictly inside a
+    single district, GRID_OUTSIDE if it touches no district, and
+    GRID_BOUNDARY if it straddles an edge. A JSON sidecar (<path>.json)
+    records the grid origin, resolution and the GeoJSON it was built from.
+    """
+    if len(district_geoms) >= GRID_BOUNDARY:
+        raise ValueError("Too many districts for a uint16 grid")
+
+    minx, miny, maxx, maxy = districts_gdf.total_bounds
+    ncols = int(math.ceil((maxx - minx) / resolution))
+    nrows = int(math.ceil((maxy - miny) / resolution))
+
+    grid_dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(grid_dir, exist_ok=True)
+    # Unique temp name so concurrent builds never write the same file
+    fd, tmp_path = tempfile.mkstemp(dir=grid_dir, prefix=os.path.basename(path) + '.', suffix='.tmp.npy')
+    os.close(fd)
+    try:
+        grid = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint16, shape=(nrows, ncols))
+        grid[:] = GRID_OUTSIDE
+
+        for idx, geom in enumerate(district_geoms):
+            if geom is None or geom.is_empty:
+                continue
+            gminx, gminy, gmaxx, gmaxy = geom.bounds
+            c0 = max(0, int((gminx - minx) // resolution))
+            c1 = min(ncols - 1, int((gmaxx - minx) // resolution))
+            r0 = max(0, int((gminy - miny) // resolution))
+            r1 = min(nrows - 1, int((gmaxy - miny) // resolution))
+
+            cols, rows = np.meshgrid(np.arange(c0, c1 + 1), np.arange(r0, r1 + 1))
+            boxes = shapely.box(
+                minx + cols * resolution, miny + rows * resolution,
+                minx + (cols + 1) * resolution, miny + (rows + 1) * resolution
+            )
+            inside = shapely.contains_properly(geom, boxes)
+            touching = shapely.intersects(geom, boxes) & ~inside
+
+            cells = grid[r0:r1 + 1, c0:c1 + 1]
+            # A cell claimed by more than one district always needs the exact test
+            claimed = inside & (cells != GRID_OUTSIDE)
+            cells[inside & ~claimed] = idx + 1
+            cells[touching | claimed] = GRID_BOUNDARY
+
+        grid.flush()
+        del grid
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    meta = {
+        'minx': float(minx),
+        'miny': float(miny),
+        'resolution': resolution,
+        'shape': [nrows, ncols],
+        'districts': len(district_geoms),
+        'source': districts_source
+    }
+    fd, tmp_meta = tempfile.mkstemp(dir=grid_dir, prefix=os.path.basename(path) + '.', suffix='.json.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, path + ".json")
+
+    print(f"District grid built: {nrows}x{ncols} cells at {resolution} deg -> {path}")
+    return meta
+
+
+def load_district_grid(resolution, path, build_if_stale=True):
+    """
+    Memory-map the district grid
+
+    If it is missing or was built from a different GeoJSON or resolution,
+    rebuild it (build_if_stale=True, as the build-grid command does) or
+    return False.
+    """
+    global district_grid, grid_meta
+
+    meta = None
+    if os.path.exists(path) and os.path.exists(path + ".json"):
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        if (meta.get('resolution') != resolution
+                or meta.get('districts') != len(district_geoms)
+                or meta.get('source') != districts_source):
+            meta = None
+
+    if meta is None:
+        if not build_if_stale:
+            return False
+        meta = build_district_grid(resolution, path)
+
+    district_grid = np.load(path, mmap_mode='r')
+    grid_meta = meta
+    return True
+
+
+def _grid_lookup(lat, lon):
+    """Return the grid cell value for a coordinate"""
+    res = grid_meta['resolution']
+    row = math.floor((lat - grid_meta['miny']) / res)
+    col = math.floor((lon - grid_meta['minx']) / res)
+    nrows, ncols = grid_meta['shape']
+    if row < 0 or col < 0 or row >= nrows or col >= ncols:
+        return GRID_OUTSIDE
+    return int(district_grid[row, col])
+
+
+def get_district_from_gps(lat, lon):
+    """
+    Get district and state name from GPS coordinates using GeoJSON
+
+    GeoJSON columns:
+    - NAME_0: Country (India)
+    - NAME_1: State name
+    - NAME_2: District name
+    """
+    if _location_cache is None:
+        return _resolve_district(lat, lon)
+
+    # Coordinates are quantized so nearby repeat pings share one entry
+    precision = Config.LOCATION_CACHE_PRECISION
+    key = (round(float(lat), precision), round(float(lon), precision))
+    location = _location_cache.get(key)
+    if location is None:
+        location = _resolve_district(lat, lon)
+        _location_cache.set(key, location)
+    return dict(location)
+
+
+def _resolve_district(lat, lon):
+    """Resolve a coordinate against the district geometries (uncached)"""
+    _ensure_loaded()
+
+    # Fast path: cells fully inside (or outside) every district answer directly
+    if district_grid is not None:
+        cell = _grid_lookup(lat, lon)
+        if cell == GRID_OUTSIDE:
+            return {'district': 'Unknown', 'state': 'Unknown'}
+        if cell != GRID_BOUNDARY:
+            return {
+                'district': district_names[cell - 1],
+                'state': state_names[cell - 1]
+            }
+
+    point = Point(lon, lat)  # IMPORTANT: (lon, lat)
+
+    # Candidates whose bounding box contains the point, in file order
+    for idx in sorted(district_tree.query(point)):
+        if _contains(idx, point):
+            return {
+                'district': district_names[idx],  # District name column in GeoJSON
+                'state': state_names[idx]         # State name column in GeoJSON
+            }
+
+    return {'district': 'Unknown', 'state': 'Unknown'}
+
+
+def get_districts_for_points(points):
+    """
+    Resolve many (lat, lon) pairs with one vectorized spatial join
+
+    Args:
+        points: List of (lat, lon) tuples
+
+    Returns:
+        List of {'district', 'state'} dicts in input order
+    """
+    if not points:
+        return []
+
+    _ensure_loaded()
+    coords = np.asarray(points, dtype=np.float64)
+    points_gdf = gpd.GeoDataFrame(
+        geometry=gpd.points_from_xy(coords[:, 1], coords[:, 0]),  # (lon, lat)
+        crs=districts_gdf.crs
+    )
+    joined = gpd.sjoin(points_gdf, districts_gdf[["NAME_1", "NAME_2", "geometry"]],
+                       how="left", predicate="within")
+
+    # Where district polygons overlap a point can match several; keep the
+    # first in file order, as get_district_from_gps does
+    joined = joined.sort_values("index_right", kind="stable")
+    joined = joined[~joined.index.duplicated(keep="first")].sort_index()
+
+    results = []
+    for district, state in zip(joined["NAME_2"].tolist(), joined["NAME_1"].tolist()):
+        if isinstance(district, str):
+            results.append({'district': district, 'state': state})
+        else:
+            results.append({'district': 'Unknown', 'state': 'Unknown'})
+    return results
+
+
+if __name__ == '__main__':
+    # python location_service.py build-cache | build-grid | simplify-report
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'simplify-report':
+        print(json.dumps(simplification_report(), indent=2))
+    elif command == 'build-cache':
+        build_districts_cache()
+    elif command == 'build-grid':
+        _ensure_loaded()
+        build_district_grid(Config.LOCATION_GRID_RESOLUTION, Config.LOCATION_GRID_PATH)
+    else:
+        print("Usage: python location_service.py [build-cache | build-grid | simplify-report]")
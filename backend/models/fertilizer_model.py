@@ -0,0 +1,199 @@
+"""
+Fertilizer recommendation by k-nearest neighbours over data/data_core.csv
+
+data_core.csv has 8,000 labelled rows of (temperature, humidity, moisture,
+soil type, crop, N, K, P) -> fertilizer. At load the numeric columns are
+standardized and one KD-tree is built per (soil type, crop) partition,
+plus one over all rows for queries whose soil/crop combination is unknown
+or missing. A recommendation is the majority vote of the k nearest rows.
+
+The CSV is served through the reference data manager, so the index is
+rebuilt in the background when the file changes.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+from reference_data import get_reference_data, data_path
+
+DATA_PATH = data_path('data_core.csv')
+
+# Request field -> data_core.csv column (the CSV spells it "Temparature")
+FEATURE_FIELDS = [
+    ('temperature', 'Temparature'),
+    ('humidity', 'Humidity'),
+    ('moisture', 'Moisture'),
+    ('N', 'Nitrogen'),
+    ('K', 'Potassium'),
+    ('P', 'Phosphorous')
+]
+
+# Crop names used elsewhere in the app -> names used in data_core.csv
+CROP_ALIASES = {
+    'rice': 'paddy',
+    'groundnut': 'ground nuts',
+    'groundnuts': 'ground nuts',
+    'peanut': 'ground nuts',
+    'millet': 'millets',
+    'pearl millet': 'millets',
+    'oilseeds': 'oil seeds',
+    'mustard': 'oil seeds',
+    'pulse': 'pulses'
+}
+
+
+def _normalize(name):
+    return " ".join(str(name).split()).lower()
+
+
+def _normalize_crop(name):
+    name = _normalize(name)
+    return CROP_ALIASES.get(name, name)
+
+
+class FertilizerIndex:
+    """Standardized feature space and KD-trees for one snapshot of data_core.csv"""
+
+    def __init__(self, frame):
+        features = frame[[column for _, column in FEATURE_FIELDS]].to_numpy(dtype=np.float64)
+        self.mean = features.mean(axis=0)
+        self.scale = features.std(axis=0)
+        self.scale[self.scale == 0] = 1.0
+        scaled = (features - self.mean) / self.scale
+        labels = frame['Fertilizer Name'].astype(str).str.strip().to_numpy(dtype=object)
+
+        soils = frame['Soil Type'].map(_normalize)
+        crops = frame['Crop Type'].map(_normalize)
+
+        self.rows = len(frame)
+        self.all = (KDTree(scaled), labels)
+        self.partitions = {}
+        for key, positions in frame.groupby([soils, crops]).indices.items():
+            self.partitions[key] = (KDTree(scaled[positions]), labels[positions])
+
+    @classmethod
+    def from_file(cls, path):
+        frame = pd.read_csv(path)
+        frame.columns = frame.columns.str.strip()
+        required = [column for _, column in FEATURE_FIELDS] + ['Soil Type', 'Crop Type', 'Fertilizer Name']
+        frame = frame.dropna(subset=required)
+        index = cls(frame)
+        print(f"Fertilizer index built: {index.rows} rows, {len(index.partitions)} soil/crop partitions")
+        return index
+
+    def query(self, features, soil_types, crops, k):
+        """
+        Recommend a fertilizer for each row
+
+        Rows are grouped by partition so each KD-tree is queried once.
+
+        Args:
+            features: (n, len(FEATURE_FIELDS)) array in FEATURE_FIELDS order
+            soil_types, crops: per-row names (None = unknown)
+            k: Number of neighbours that vote
+
+        Returns:
+            list of result dicts, in input order
+        """
+        scaled = (np.asarray(features, dtype=np.float64) - self.mean) / self.scale
+
+        groups = {}
+        for row, (soil, crop) in enumerate(zip(soil_types, crops)):
+            key = None
+            if soil and crop:
+                key = (_normalize(soil), _normalize_crop(crop))
+                if key not in self.partitions:
+                    key = None
+            groups.setdefault(key, []).append(row)
+
+        results = [None] * len(scaled)
+        for key, rows in groups.items():
+            tree, labels = self.partitions[key] if key else self.all
+            neighbours = min(k, len(labels))
+            distances, positions = tree.query(scaled[rows], k=neighbours)
+            partition = f"{key[0]}/{key[1]}" if key else "all"
+            for row, row_distances, row_positions in zip(rows, distances, positions):
+                results[row] = _vote(labels[row_positions], row_distances, partition)
+        return results
+
+
+def _vote(neighbour_labels, distances, partition):
+    """Majority vote; ties go to the label of the nearest neighbour"""
+    votes = {}
+    for label in neighbour_labels:
+        votes[label] = votes.get(label, 0) + 1
+    best = max(votes.values())
+    # Neighbours come back nearest first
+    fertilizer = next(label for label in neighbour_labels if votes[label] == best)
+    return {
+        'fertilizer': fertilizer,
+        'confidence': round(best / len(neighbour_labels), 4),
+        'votes': votes,
+        'neighbors': len(neighbour_labels),
+        'nearest_distance': round(float(distances[0]), 4),
+        'partition': partition
+    }
+
+
+get_reference_data().register('fertilizer', [DATA_PATH], FertilizerIndex.from_file)
+
+
+def extract_fertilizer_features(data):
+    """
+    Build the feature vector for one request record.
+    Raises ValueError if a field is missing or not a finite number.
+    """
+    features = []
+    for field, _ in FEATURE_FIELDS:
+        value = data.get(field)
+        if value is None or value == '':
+            raise ValueError(f"Missing field '{field}'")
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value for '{field}': {value!r}")
+        if not math.isfinite(number):
+            raise ValueError(f"Invalid value for '{field}': {value!r} is not a finite number")
+        features.append(number)
+    return features
+
+
+def recommend_fertilizer(rows, k=5):
+    """
+    Recommend fertilizers for many records in one pass
+
+    Args:
+        rows: list of dicts with the FEATURE_FIELDS plus optional
+            'soil_type' and 'crop'
+        k: Number of neighbours that vote
+
+    Returns:
+        (results, dataset version); each result is a recommendation dict or
+        {"error": ...} for a record that failed validation
+    """
+    snapshot = get_reference_data().get('fertilizer')
+    results = [None] * len(rows)
+    valid = []
+    features = []
+    for position, row in enumerate(rows):
+        try:
+            features.append(extract_fertilizer_features(row))
+        except ValueError as e:
+            results[position] = {'error': str(e)}
+            continue
+        valid.append(position)
+
+    if valid:
+        recommendations = snapshot.data.query(
+            features,
+            [rows[position].get('soil_type') for position in valid],
+            [rows[position].get('crop') for position in valid],
+            k
+        )
+        for position, recommendation in zip(valid, recommendations):
+            results[position] = recommendation
+    return results, snapshot.version
+
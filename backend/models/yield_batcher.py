@@ -0,0 +1,166 @@
+"""
+Micro-batching for single-row yield predictions
+
+Concurrent callers submit one feature vector each. A background thread
+collects them for a short window (or until max_rows are queued), runs a
+single predict over the stacked matrix and hands each caller its result.
+If that predict fails, each row is retried on its own, so only the
+request whose row the model rejects gets the error.
+"""
+
+import os
+import queue
+import threading
+import time
+
+# Upper bounds of the histogram buckets for batch size and queue depth
+HISTOGRAM_BUCKETS = [0, 1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+
+def _empty_histogram():
+    buckets = {str(b): 0 for b in HISTOGRAM_BUCKETS}
+    buckets['+Inf'] = 0
+    return buckets
+
+
+def _observe(histogram, value):
+    for bound in HISTOGRAM_BUCKETS:
+        if value <= bound:
+            histogram[str(bound)] += 1
+            return
+    histogram['+Inf'] += 1
+
+
+class _PendingPrediction:
+    __slots__ = ('features', 'event', 'result', 'error')
+
+    def __init__(self, features):
+        self.features = features
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class PredictionBatcher:
+    """Coalesces concurrent single-row predictions into one predict call"""
+
+    def __init__(self, predict_batch_fn, window_ms=2.0, max_rows=64, timeout=5.0):
+        """
+        Args:
+            predict_batch_fn: Callable taking a list of feature rows and
+                returning a list of predictions in the same order
+            window_ms: How long to wait for more rows after the first one
+            max_rows: Dispatch immediately once this many rows are queued
+            timeout: Seconds a caller waits for its result
+        """
+        self._predict_batch = predict_batch_fn
+        self.window = window_ms / 1000.0
+        self.max_rows = max_rows
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'batches': 0,
+            'errors': 0,
+            'split_batches': 0,
+            'max_batch_size': 0
+        }
+        self._batch_size_histogram = _empty_histogram()
+        self._queue_depth_histogram = _empty_histogram()
+
+    def _ensure_worker(self):
+        # Restart the worker after a fork (e.g. pre-forking app servers)
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            if self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+            self._worker = threading.Thread(target=self._run, name='yield-batcher', daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
+
+    def submit(self, features):
+        """
+        Queue one feature vector and block until its prediction is ready.
+        Raises the model's exception if the batch failed.
+        """
+        self._ensure_worker()
+        pending = _PendingPrediction(features)
+        self._queue.put(pending)
+
+        if not pending.event.wait(self.timeout):
+            raise TimeoutError("Timed out waiting for batched prediction")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self):
+        """Block for the first row, then gather more until the window closes"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            depth = self._queue.qsize()
+
+            split = False
+            try:
+                predictions = self._predict_batch([p.features for p in batch])
+                for pending, prediction in zip(batch, predictions):
+                    pending.result = prediction
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0].error = e
+                else:
+                    # Don't fail unrelated requests that shared the window
+                    split = True
+                    for pending in batch:
+                        try:
+                            pending.result = self._predict_batch([pending.features])[0]
+                        except Exception as row_error:
+                            pending.error = row_error
+            failed = any(pending.error is not None for pending in batch)
+
+            for pending in batch:
+                pending.event.set()
+
+            with self._stats_lock:
+                self._stats['requests'] += len(batch)
+                self._stats['batches'] += 1
+                if split:
+                    self._stats['split_batches'] += 1
+                self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(batch))
+                if failed:
+                    self._stats['errors'] += 1
+                _observe(self._batch_size_histogram, len(batch))
+                _observe(self._queue_depth_histogram, depth)
+
+    def get_stats(self):
+        """Return counters and histograms for batch size and queue depth"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats['batch_size_histogram'] = dict(self._batch_size_histogram)
+            stats['queue_depth_histogram'] = dict(self._queue_depth_histogram)
+        stats['window_ms'] = self.window * 1000.0
+        stats['max_rows'] = self.max_rows
+        stats['queue_depth'] = self._queue.qsize()
+        stats['mean_batch_size'] = (
+            round(stats['requests'] / stats['batches'], 2) if stats['batches'] else 0
+        )
+        return stats
@@ -4,8 +4,41 @@ import os
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 import pickle
+import hashlib
+import math
+import threading
+import time
+from config import Config
+from models.yield_batcher import PredictionBatcher
 
-MODEL_PATH = "backend/models/yield_model.pkl"
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "yield_model.pkl")
+
+# Feature order the model was trained on, with the defaults used when a
+# field is missing from the request: [N, P, K, temp, humidity, ph, rainfall, area]
+FEATURE_FIELDS = [
+    ('N', 0),
+    ('P', 0),
+    ('K', 0),
+    ('temperature', 25),
+    ('humidity', 50),
+    ('ph', 6.5),
+    ('rainfall', 100),
+    ('area', 1)
+]
+
+# Model registry state (one resident model per worker process)
+_model = None
+_model_signature = None   # (mtime_ns, size) of the pickle the model came from
+_model_hash = None        # sha256 of the pickle the model came from
+_model_lock = threading.Lock()
+_model_stats = {
+    'loads': 0,
+    'reloads_skipped': 0,
+    'hits': 0,
+    'last_load_seconds': None,
+    'total_load_seconds': 0.0,
+    'loaded_at': None
+}
 
 def train_dummy_model():
     """
@@ -48,11 +81,135 @@ def load_yield_model():
         model = pickle.load(f)
     return model
 
+def _file_signature(path):
+    """Return (mtime_ns, size) for path, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _file_hash(path):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_yield_model():
+    """
+    Thread-safe accessor for the resident yield model.
+    
+    The pickle is loaded once per worker process. On each call only the
+    file's mtime/size is checked; if it changed, the content hash decides
+    whether the model is actually reloaded (a plain `touch` does not
+    trigger an unpickle).
+    """
+    global _model, _model_signature, _model_hash
+    
+    signature = _file_signature(MODEL_PATH)
+    if _model is not None and signature == _model_signature:
+        with _model_lock:
+            _model_stats['hits'] += 1
+        return _model
+    
+    with _model_lock:
+        # Another thread may have reloaded while we waited for the lock
+        signature = _file_signature(MODEL_PATH)
+        if _model is not None and signature == _model_signature:
+            _model_stats['hits'] += 1
+            return _model
+        
+        if signature is None:
+            train_dummy_model()
+            signature = _file_signature(MODEL_PATH)
+        
+        file_hash = _file_hash(MODEL_PATH)
+        if _model is not None and file_hash == _model_hash:
+            # Touched but unchanged: keep the resident model
+            _model_signature = signature
+            _model_stats['reloads_skipped'] += 1
+            _model_stats['hits'] += 1
+            return _model
+        
+        start = time.perf_counter()
+        model = load_yield_model()
+        elapsed = time.perf_counter() - start
+        
+        _model = model
+        _model_signature = signature
+        _model_hash = file_hash
+        _model_stats['loads'] += 1
+        _model_stats['last_load_seconds'] = round(elapsed, 6)
+        _model_stats['total_load_seconds'] = round(_model_stats['total_load_seconds'] + elapsed, 6)
+        _model_stats['loaded_at'] = time.time()
+        print(f"Yield model loaded in {elapsed * 1000:.1f} ms (sha256 {file_hash[:12]})")
+        return _model
+
+def get_model_stats():
+    """Return a snapshot of the model registry metrics"""
+    with _model_lock:
+        stats = dict(_model_stats)
+        stats['model_path'] = MODEL_PATH
+        stats['model_sha256'] = _model_hash
+        stats['resident'] = _model is not None
+    return stats
+
+def extract_features(data):
+    """
+    Build the model feature vector from a request record.
+    Missing or empty fields fall back to the defaults in FEATURE_FIELDS.
+    Raises ValueError if a field is not a finite number (nan/inf included).
+    """
+    features = []
+    for field, default in FEATURE_FIELDS:
+        value = data.get(field)
+        if value is None or value == '':
+            value = default
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value for '{field}': {value!r}")
+        if not math.isfinite(number):
+            raise ValueError(f"Invalid value for '{field}': {value!r} is not a finite number")
+        features.append(number)
+    return features
+
 def predict_yield_val(features):
     """
     features: [N, P, K, temp, humidity, ph, rainfall, area]
     """
-    model = load_yield_model()
+    if _batcher is not None:
+        return _batcher.submit(features)
+    
+    model = get_yield_model()
     # features needs to be 2D array
     prediction = model.predict([features])
     return prediction[0]
+
+def predict_yield_batch(feature_rows):
+    """
+    feature_rows: list of [N, P, K, temp, humidity, ph, rainfall, area]
+    Runs a single vectorized predict over all rows.
+    Returns a list of floats in the same order.
+    """
+    if not feature_rows:
+        return []
+    model = get_yield_model()
+    matrix = np.asarray(feature_rows, dtype=np.float64)
+    predictions = model.predict(matrix)
+    return predictions.tolist()
+
+# Coalesce concurrent single-row predictions into one predict call
+_batcher = None
+if Config.YIELD_BATCHING_ENABLED:
+    _batcher = PredictionBatcher(
+        predict_yield_batch,
+        window_ms=Config.YIELD_BATCH_WINDOW_MS,
+        max_rows=Config.YIELD_BATCH_MAX_ROWS
+    )
+
+def get_batcher_stats():
+    """Return micro-batching metrics, or None if batching is disabled"""
+    return _batcher.get_stats() if _batcher is not None else None
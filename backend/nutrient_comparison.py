@@ -3,40 +3,42 @@ Nutrient Comparison System
 Compares crop nutrient needs against state-level soil availability
 """
 
+import numpy as np
 import pandas as pd
-import os
 
-# Global variables for storing CSV data (loaded once at startup)
-soil_data = None
-crop_data = None
+from reference_data import get_reference_data, data_path
+from utils.lru_cache import LRUCache
 
-def load_data():
-    """
-    Load CSV files once at module import
-    """
-    global soil_data, crop_data
-    
-    # Get the directory where this file is located
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    data_dir = os.path.join(current_dir, 'data')
-    
-    # Load soil data (district-level)
-    soil_path = os.path.join(data_dir, 'soil.csv')
-    soil_data = pd.read_csv(soil_path)
-    
-    #  Clean column names (remove spaces)
-    soil_data.columns = soil_data.columns.str.strip()
-    
-    # Load crop nutrient requirements
-    crop_path = os.path.join(data_dir, 'crop_need.csv')
-    crop_data = pd.read_csv(crop_path)
-    
-    # Clean column names
-    crop_data.columns = crop_data.columns.str.strip()
-    
-    print("✅ CSV data loaded successfully")
-    print(f"Soil data shape: {soil_data.shape}")
-    print(f"Crop data shape: {crop_data.shape}")
+SOIL_PATH = data_path('soil.csv')
+CROP_PATH = data_path('crop_need.csv')
+
+# Micronutrient columns in soil.csv (after stripping header whitespace)
+SOIL_NUTRIENT_COLUMNS = ['Zn %', 'Fe%', 'Cu %', 'Mn %', 'B %', 'S %']
+
+# crop_need.csv headers are messy ("\ufeffCrop", "Nitrogen  ", "Phosphor",
+# "Potassium "); normalized header -> canonical column name
+CROP_COLUMN_ALIASES = {
+    'crop': 'Crop',
+    'nitrogen': 'Nitrogen', 'n': 'Nitrogen',
+    'phosphor': 'Phosphorus', 'phosphorus': 'Phosphorus', 'phosphorous': 'Phosphorus', 'p': 'Phosphorus',
+    'potassium': 'Potassium', 'k': 'Potassium'
+}
+
+# Common alternative crop names -> name used in crop_need.csv
+CROP_NAME_ALIASES = {
+    'paddy': 'Rice',
+    'corn': 'Maize',
+    'gram': 'Chickpea', 'bengal gram': 'Chickpea', 'chana': 'Chickpea',
+    'peanut': 'Groundnut',
+    'rapeseed': 'Mustard',
+    'bajra': 'Pearl Millet',
+    'jowar': 'Sorghum',
+    'arhar': 'Pigeon Pea', 'tur': 'Pigeon Pea', 'red gram': 'Pigeon Pea',
+    'soyabean': 'Soybean', 'soya': 'Soybean'
+}
+
+MATRIX_NUTRIENTS = ['Nitrogen', 'Phosphorus', 'Potassium']
+MATRIX_COLUMNS = ['state', 'crop', 'nutrient', 'crop_required', 'state_available', 'percentage', 'status']
 
 # Simple district to state mapping (based on GeoJSON structure)
 # This maps districts in soil.csv to their respective states
@@ -67,61 +69,251 @@ DISTRICT_TO_STATE = {
     # Add more as needed - for now, we'll dynamically infer from district names
 }
 
-def get_state_soil_data(state_name):
-    """
-    Aggregate district-level soil data to state level
-    Returns average nutrient availability for the state
+def normalize_state_name(name):
+    """Normalize a state name for lookups ("  gujarat " -> "gujarat")"""
+    return " ".join(str(name).split()).lower()
+
+def normalize_crop_name(name):
+    """Normalize a crop name or CSV header ("Pearl-Millet " -> "pearl millet")"""
+    name = str(name).replace('\ufeff', '').replace('-', ' ').replace('_', ' ')
+    return " ".join(name.split()).lower()
+
+def _aggregate(frame, name):
+    """Build the aggregate record for a group of district rows"""
+    columns = [col for col in SOIL_NUTRIENT_COLUMNS if col in frame.columns]
+    values = frame[columns].agg(['mean', 'min', 'max'])
+    return {
+        'state': name,
+        'districts': int(len(frame)),
+        'mean': {col: float(values.at['mean', col]) for col in columns},
+        'min': {col: float(values.at['min', col]) for col in columns},
+        'max': {col: float(values.at['max', col]) for col in columns}
+    }
+
+def build_state_soil_stats(soil_data):
     """
-    global soil_data
+    Precompute per-state soil aggregates with a single groupby
     
-    if soil_data is None:
-        load_data()
+    Every district in soil.csv that appears in DISTRICT_TO_STATE is tagged
+    with its state, and mean/min/max/district count for each micronutrient
+    are computed in one pass, so a request is just a dict lookup.
+    
+    Returns:
+        dict of normalized state name -> aggregate record
+    """
+    districts = soil_data['District'].astype(str).str.strip()
+    states = districts.map(DISTRICT_TO_STATE)
+    columns = [col for col in SOIL_NUTRIENT_COLUMNS if col in soil_data.columns]
+    
+    grouped = soil_data.loc[states.notna(), columns].groupby(states[states.notna()])
+    means = grouped.mean()
+    mins = grouped.min()
+    maxs = grouped.max()
+    counts = grouped.size()
+    
+    stats = {}
+    for state in counts.index:
+        stats[normalize_state_name(state)] = {
+            'state': state,
+            'districts': int(counts[state]),
+            'mean': {col: float(means.at[state, col]) for col in columns},
+            'min': {col: float(mins.at[state, col]) for col in columns},
+            'max': {col: float(maxs.at[state, col]) for col in columns}
+        }
+    return stats
+
+def build_crop_index(crop_data):
+    """
+    Index crop requirements by normalized name and alias
     
-    # Filter districts belonging to this state
-    state_districts = [dist for dist, st in DISTRICT_TO_STATE.items() if st == state_name]
+    Each crop becomes a small record with plain Python ints, so lookups
+    never touch the DataFrame.
     
-    # Filter soil data for these districts
-    state_soil = soil_data[soil_data['District'].isin(state_districts)]
+    Returns:
+        (index, records): normalized name/alias -> record, and the unique
+        records in file order
+    """
+    index = {}
+    records = []
+    for crop, nitrogen, phosphorus, potassium in zip(
+        crop_data['Crop'], crop_data['Nitrogen'], crop_data['Phosphorus'], crop_data['Potassium']
+    ):
+        if pd.isna(crop) or pd.isna(nitrogen) or pd.isna(phosphorus) or pd.isna(potassium):
+            continue
+        key = normalize_crop_name(crop)
+        # First row wins, matching the old iloc[0] behaviour
+        if key in index:
+            continue
+        record = {
+            'crop': str(crop).strip(),
+            'requirements': {
+                'Nitrogen': int(nitrogen),
+                'Phosphorus': int(phosphorus),
+                'Potassium': int(potassium)
+            }
+        }
+        index[key] = record
+        records.append(record)
+    
+    for alias, crop in CROP_NAME_ALIASES.items():
+        record = index.get(normalize_crop_name(crop))
+        if record is not None:
+            index.setdefault(alias, record)
+    
+    return index, records
+
+def build_comparison_matrix(states, records):
+    """
+    Compute the comparison for every (state, crop, nutrient) in one vectorized pass
     
-    if state_soil.empty:
-        # If no exact match, try partial matching
-        state_soil = soil_data[soil_data['District'].str.contains(state_name, case=False, na=False)]
+    Uses the same placeholder availability model as compare_nutrients()
+    (the state supplies 85% of the crop requirement), so each row matches
+    what /api/nutrient-comparison returns for that state and crop.
     
-    if state_soil.empty:
-        return None
+    Returns:
+        DataFrame with MATRIX_COLUMNS, ordered by state, crop, nutrient
+    """
+    if not states or not records:
+        return pd.DataFrame(columns=MATRIX_COLUMNS)
+    
+    required = np.array(
+        [[record['requirements'][n] for n in MATRIX_NUTRIENTS] for record in records],
+        dtype=float
+    )
+    n_states, (n_crops, n_nutrients) = len(states), required.shape
+    
+    # (states, crops, nutrients)
+    required = np.broadcast_to(required, (n_states, n_crops, n_nutrients))
+    available = required * 0.85
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentage = np.where(required > 0, available / required * 100, np.nan)
+    status = np.select(
+        [np.isnan(percentage), percentage < 80, percentage <= 120],
+        ['Not required', 'Low', 'Sufficient'],
+        'Excess'
+    )
+    
+    percentage = np.round(percentage.ravel(), 2)
+    frame = pd.DataFrame({
+        'state': np.repeat(np.array(states, dtype=object), n_crops * n_nutrients),
+        'crop': np.tile(np.repeat(np.array([r['crop'] for r in records], dtype=object), n_nutrients), n_states),
+        'nutrient': np.tile(np.array(MATRIX_NUTRIENTS, dtype=object), n_states * n_crops),
+        'crop_required': required.ravel().astype(int),
+        'state_available': np.round(available.ravel(), 2),
+        'percentage': pd.Series(percentage, dtype=object).where(~np.isnan(percentage), None),
+        'status': status.ravel()
+    })
+    return frame
+
+class NutrientData:
+    """
+    One parsed snapshot of soil.csv and crop_need.csv with its derived indexes
     
-    # Calculate average values for each nutrient (excluding non-numeric columns)
-    numeric_cols = ['Zn %', 'Fe%', 'Cu %', 'Mn %', 'B %', 'S %']
-    avg_values = {}
+    Built by the reference data manager off the request path and swapped in
+    whole when the files change; treat it as read-only.
+    """
     
-    for col in numeric_cols:
-        if col in state_soil.columns:
-            avg_values[col] = state_soil[col].mean()
+    def __init__(self, soil_data, crop_data):
+        self.soil_data = soil_data
+        self.crop_data = crop_data
+        self.state_soil_stats = build_state_soil_stats(soil_data)
+        self.crop_index, self.crop_records = build_crop_index(crop_data)
+        self.states = sorted(summary['state'] for summary in self.state_soil_stats.values())
+        self.matrix = build_comparison_matrix(self.states, self.crop_records)
+        # States answered by the district-name fallback, memoized per normalized name
+        self._fallback_cache = LRUCache(maxsize=256)
+    
+    @classmethod
+    def from_files(cls, soil_path, crop_path):
+        """Parse the CSVs and build a snapshot"""
+        # Load soil data (district-level)
+        soil_data = pd.read_csv(soil_path)
+        
+        #  Clean column names (remove spaces)
+        soil_data.columns = soil_data.columns.str.strip()
+        
+        # Load crop nutrient requirements
+        crop_data = pd.read_csv(crop_path)
+        
+        # Clean column names (BOM, stray spaces, "Phosphor")
+        crop_data.columns = [
+            CROP_COLUMN_ALIASES.get(normalize_crop_name(col), str(col).strip())
+            for col in crop_data.columns
+        ]
+        
+        data = cls(soil_data, crop_data)
+        
+        print("✅ CSV data loaded successfully")
+        print(f"Soil data shape: {soil_data.shape}")
+        print(f"Crop data shape: {crop_data.shape}")
+        return data
+    
+    def state_summary(self, state_name):
+        """Precomputed aggregates for a state, or None if no districts match"""
+        key = normalize_state_name(state_name)
+        summary = self.state_soil_stats.get(key)
+        if summary is not None:
+            return summary
+        
+        # Not a mapped state: fall back to districts whose name contains it
+        # (e.g. "Goa" -> North Goa, South Goa). Memoized, including misses.
+        cached = self._fallback_cache.get(key, False)
+        if cached is not False:
+            return cached
+        soil_data = self.soil_data
+        matches = soil_data[soil_data['District'].str.contains(state_name.strip(), case=False, na=False, regex=False)]
+        summary = _aggregate(matches, state_name.strip()) if not matches.empty else None
+        self._fallback_cache.set(key, summary)
+        return summary
+    
+    def crop_requirements(self, crop_name):
+        """Requirement record for a crop name or alias, or None"""
+        return self.crop_index.get(normalize_crop_name(crop_name))
+
+get_reference_data().register('nutrients', [SOIL_PATH, CROP_PATH], NutrientData.from_files)
+
+def get_nutrient_snapshot():
+    """Active soil/crop snapshot; .data is a NutrientData, .version its dataset version"""
+    return get_reference_data().get('nutrients')
+
+def load_data():
+    """
+    Re-read the CSV files now (normally the reference data watcher does this)
+    """
+    get_reference_data().refresh('nutrients', force=True)
+    return get_nutrient_snapshot().data
+
+def get_state_soil_summary(state_name):
+    """
+    Return precomputed soil aggregates for a state
     
-    return avg_values
+    Returns:
+        dict with 'state', 'districts' and per-nutrient 'mean', 'min', 'max',
+        or None if no districts match
+    """
+    return get_nutrient_snapshot().data.state_summary(state_name)
+
+def get_state_soil_data(state_name):
+    """
+    Aggregate district-level soil data to state level
+    Returns average nutrient availability for the state
+    """
+    summary = get_state_soil_summary(state_name)
+    if summary is None:
+        return None
+    return dict(summary['mean'])
 
 def get_crop_requirements(crop_name):
     """
     Get nutrient requirements for a specific crop
     """
-    global crop_data
-    
-    if crop_data is None:
-        load_data()
+    record = get_nutrient_snapshot().data.crop_requirements(crop_name)
     
-    crop_row = crop_data[crop_data['Crop'].str.lower() == crop_name.lower()]
-    
-    if crop_row.empty:
+    if record is None:
         return None
     
-    # Extract NPK values and convert to Python int for JSON serialization
-    requirements = {
-        'Nitrogen': int(crop_row.iloc[0]['Nitrogen']),
-        'Phosphorus': int(crop_row.iloc[0]['Phosphor']),
-        'Potassium': int(crop_row.iloc[0]['Potassium'])
-    }
-    
-    return requirements
+    # Copy so callers can't modify the shared record
+    return dict(record['requirements'])
 
 def calculate_nutrient_status(state_value, crop_required):
     """
@@ -164,14 +356,18 @@ def compare_nutrients(state, crop):
     Returns:
         dict with comparison results or error
     """
+    # One snapshot for the whole comparison, even if a reload lands mid-request
+    snapshot = get_nutrient_snapshot()
+    
     # Get crop requirements
-    crop_req = get_crop_requirements(crop)
+    record = snapshot.data.crop_requirements(crop)
     
-    if crop_req is None:
+    if record is None:
         return {'error': f'Crop "{crop}" not found in database'}
+    crop_req = record['requirements']
     
     # Get state soil data
-    state_soil = get_state_soil_data(state)
+    state_soil = snapshot.data.state_summary(state)
     
     if state_soil is None:
         return {'error': f'State "{state}" soil data not found'}
@@ -180,6 +376,7 @@ def compare_nutrients(state, crop):
     result = {
         'state': state,
         'crop': crop,
+        'dataset_version': snapshot.version,
         'nutrient_comparison': []
     }
     
@@ -197,27 +394,87 @@ def compare_nutrients(state, crop):
         # Placeholder: assume state has 85% of required value on average
         # In reality, you'd look this up from a proper dataset
         state_value = crop_value * 0.85  # Example calculation
-        percentage = (state_value / crop_value) * 100
         
-        if percentage < 80:
-            status = "Low"
-        elif 80 <= percentage <= 120:
-            status = "Sufficient"
+        # Same rules as build_comparison_matrix(): a crop that needs none of
+        # a nutrient has no percentage
+        if crop_value <= 0:
+            percentage = None
+            status = "Not required"
         else:
-            status = "Excess"
+            percentage = round((state_value / crop_value) * 100, 2)
+            if percentage < 80:
+                status = "Low"
+            elif 80 <= percentage <= 120:
+                status = "Sufficient"
+            else:
+                status = "Excess"
         
         result['nutrient_comparison'].append({
             'nutrient': nutrient,
             'crop_required': crop_value,
             'state_available': round(state_value, 2),
-            'percentage': round(percentage, 2),
+            'percentage': percentage,
             'status': status
         })
     
     return result
 
+def get_comparison_matrix(states=None, crops=None, nutrients=None, statuses=None):
+    """
+    Crop-by-state nutrient comparison with optional filters
+    
+    Args:
+        states: State names to include (default all mapped states). Names
+            that only resolve through the district fallback are computed
+            on demand.
+        crops: Crop names or aliases to include (default all)
+        nutrients: Subset of MATRIX_NUTRIENTS
+        statuses: Subset of Low / Sufficient / Excess / Not required
+    
+    Returns:
+        (DataFrame with MATRIX_COLUMNS, dataset version)
+    """
+    snapshot = get_nutrient_snapshot()
+    data = snapshot.data
+    frame = data.matrix
+    mask = np.ones(len(frame), dtype=bool)
+    
+    if states:
+        wanted = {}
+        extra = []
+        for name in states:
+            summary = data.state_summary(name)
+            if summary is None:
+                continue
+            if normalize_state_name(summary['state']) in data.state_soil_stats:
+                wanted[summary['state']] = True
+            elif summary['state'] not in extra:
+                extra.append(summary['state'])
+        mask &= frame['state'].isin(list(wanted)).to_numpy()
+        if extra:
+            frame = pd.concat([frame, build_comparison_matrix(extra, data.crop_records)], ignore_index=True)
+            mask = np.concatenate([mask, np.ones(len(frame) - len(mask), dtype=bool)])
+    
+    if crops:
+        names = set()
+        for name in crops:
+            record = data.crop_requirements(name)
+            if record is not None:
+                names.add(record['crop'])
+        mask &= frame['crop'].isin(names).to_numpy()
+    
+    if nutrients:
+        wanted_nutrients = {n.strip().lower() for n in nutrients}
+        mask &= frame['nutrient'].str.lower().isin(wanted_nutrients).to_numpy()
+    
+    if statuses:
+        wanted_statuses = {s.strip().lower() for s in statuses}
+        mask &= frame['status'].str.lower().isin(wanted_statuses).to_numpy()
+    
+    return frame[mask].reset_index(drop=True), snapshot.version
+
 # Load data when module is imported
 try:
-    load_data()
+    get_nutrient_snapshot()
 except Exception as e:
     print(f"Note: CSV data will be loaded on first API call. Error: {e}")
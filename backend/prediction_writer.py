@@ -0,0 +1,380 @@
+"""
+Write-behind persistence for prediction history
+
+/api/predict_yield hands its prediction to the writer and returns at once.
+A background thread drains the bounded in-memory queue and stores the
+records with multi-row INSERTs.
+
+Durability: every queued record is also appended to a per-process
+journal. The journal is split into segments of at most batch_size
+records; a segment is deleted as soon as all of its records have been
+written (or moved to the overflow file), and the open segment is
+truncated whenever the queue is fully drained, so the journal stays small
+under steady traffic. Records that do not fit in the queue, or whose
+batch failed to insert, go to an overflow file that the worker replays
+when it is idle. On startup, journal and overflow files left by dead
+processes (or by an earlier writer in a process that reused our PID) are
+adopted and replayed, so a crash loses nothing. Only records of segments
+that were not yet deleted are replayed, so a crash re-inserts at most
+about one segment's worth of already-written records. File names carry
+the PID and a random per-start token, so a new writer never opens a
+predecessor's journal.
+
+Journal writes are flushed to the OS on every submit, which survives a
+process crash. They are only fsync'ed with fsync=True
+(PREDICTION_JOURNAL_FSYNC); without it, records from the last few seconds
+can be lost if the host itself goes down.
+
+When a batch is rejected with a data error (e.g. a NOT NULL column
+without a value), it is split in halves and retried until the bad records
+are isolated. Those go to a dead-letter file for inspection instead of
+the overflow file, so they are not retried forever and do not hold back
+the valid records of their batch.
+"""
+
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+
+class PredictionWriter:
+    """Background writer that batches prediction inserts"""
+
+    DEAD_LETTER_FILE = 'dead_letter.ndjson'
+
+    def __init__(self, save_batch_fn, spill_dir, max_queue=10000, batch_size=200, flush_interval=1.0,
+                 permanent_errors=(ValueError, TypeError, KeyError, AttributeError), fsync=False):
+        """
+        Args:
+            save_batch_fn: Callable taking a list of (user_email, prediction_data)
+                tuples and returning a list of booleans (False = unknown user)
+            spill_dir: Directory for the journal, overflow and dead-letter files
+            max_queue: Maximum records held in memory
+            batch_size: Maximum records per INSERT
+            flush_interval: Seconds to wait for a batch to fill before writing
+            permanent_errors: Exception types save_batch_fn raises for bad
+                data; retrying won't help, so the batch is split to find the
+                bad records. Any other exception is treated as transient.
+            fsync: fsync the journal on every submit (survives host crashes,
+                costs a disk sync per request)
+        """
+        self._save_batch = save_batch_fn
+        self.spill_dir = spill_dir
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.permanent_errors = tuple(permanent_errors)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._pid = None
+        self._token = None
+        self._worker = None
+        self._stats = {
+            'submitted': 0,
+            'written': 0,
+            'unknown_user': 0,
+            'overflowed': 0,
+            'replayed': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'split_batches': 0,
+            'dead_lettered': 0,
+            'last_batch_size': 0,
+            'last_flush_at': None
+        }
+
+    # --- Files -----------------------------------------------------------
+
+    def _path(self, kind):
+        return os.path.join(self.spill_dir, f"predictions-{self._pid}-{self._token}.{kind}")
+
+    def _dead_letter(self, entries):
+        """Append records that can never be inserted to the dead-letter file"""
+        failed_at = time.time()
+        lines = [json.dumps(dict(entry, failed_at=failed_at), default=str) for entry in entries]
+        with self._lock:
+            self._append_lines(os.path.join(self.spill_dir, self.DEAD_LETTER_FILE), lines)
+            self._stats['dead_lettered'] += len(lines)
+
+    def _append_lines(self, path, lines):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.writelines(line + '\n' for line in lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _adopt_orphans(self):
+        """
+        Move spill files of other writers into our overflow file
+
+        Adopts files of dead processes, and files with our PID but another
+        token (left by a dead process whose PID we reused, or by an earlier
+        writer in this process). Files being claimed by another live process
+        are left alone.
+        """
+        for path in glob.glob(os.path.join(self.spill_dir, 'predictions-*.*')):
+            name = os.path.basename(path)
+            owner, _, suffix = name[len('predictions-'):].partition('.')
+            try:
+                if '.claimed-' in suffix:
+                    pid, token = int(suffix.rsplit('.claimed-', 1)[1]), None
+                else:
+                    pid, _, token = owner.partition('-')
+                    pid = int(pid)
+            except ValueError:
+                continue
+            if (pid, token) == (self._pid, self._token):
+                continue
+            # Our PID with another token can only be a predecessor's file
+            if pid != self._pid and _pid_alive(pid):
+                continue
+            claimed = path + f".claimed-{self._pid}"
+            try:
+                os.rename(path, claimed)   # atomic: only one process adopts it
+                with open(claimed, encoding='utf-8') as f:
+                    lines = [line.rstrip('\n') for line in f if line.strip()]
+            except OSError:
+                continue
+            if lines:
+                self._append_lines(self._path('overflow'), lines)
+                print(f"Recovered {len(lines)} unsaved predictions from {name}")
+            os.remove(claimed)
+
+    # --- Lifecycle -------------------------------------------------------
+
+    def _ensure_worker(self):
+        # (Re)start after a fork so each process has its own files and thread
+        if self._pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._worker.is_alive():
+                return
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._pid = os.getpid()
+            self._token = uuid.uuid4().hex[:12]
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            # Journal segment number -> [records journaled, records done]
+            self._segments = {}
+            self._segment = -1
+            self._journal = None
+            self._open_segment()
+            self._in_flight = 0
+            self._adopt_orphans()
+            self._worker = threading.Thread(target=self._run, name='prediction-writer', daemon=True)
+            self._worker.start()
+
+    def _open_segment(self):
+        """Start a new journal segment (caller holds the lock)"""
+        if self._journal is not None:
+            self._journal.close()
+        self._segment += 1
+        self._segments[self._segment] = [0, 0]
+        self._journal = open(self._path(f"journal-{self._segment}"), 'a', encoding='utf-8')
+
+    def _release_segments(self, segments):
+        """Count records as done and drop segments that are finished (caller holds the lock)"""
+        for segment in segments:
+            self._segments[segment][1] += 1
+        for segment, (journaled, done) in list(self._segments.items()):
+            if done < journaled:
+                continue
+            if segment != self._segment:
+                os.remove(self._path(f"journal-{segment}"))
+                del self._segments[segment]
+            elif journaled and self._queue.empty():
+                # Everything journaled has now been written or moved to overflow
+                self._journal.truncate(0)
+                self._journal.seek(0)
+                self._segments[segment] = [0, 0]
+
+    def submit(self, user_email, prediction_data):
+        """Queue a prediction for persistence; never blocks on the database"""
+        self._ensure_worker()
+        line = json.dumps({'user_email': user_email, 'data': prediction_data})
+
+        with self._lock:
+            self._stats['submitted'] += 1
+            segment = self._segment
+            try:
+                self._queue.put_nowait((user_email, prediction_data, segment))
+            except queue.Full:
+                self._stats['overflowed'] += 1
+                self._append_lines(self._path('overflow'), [line])
+                return
+            self._journal.write(line + '\n')
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self._segments[segment][0] += 1
+            if self._segments[segment][0] >= self.batch_size:
+                self._open_segment()
+
+    def flush(self, timeout=5.0):
+        """Wait until the in-memory queue has been written (best effort)"""
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if self._queue.empty() and self._in_flight == 0:
+                    return
+            time.sleep(0.05)
+
+    # --- Worker ----------------------------------------------------------
+
+    def _collect(self):
+        """Wait for the first record, then fill the batch until the interval ends"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        with self._lock:
+            self._in_flight += 1
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+            with self._lock:
+                self._in_flight += 1
+        return batch
+
+    def _write(self, batch):
+        """
+        Insert a batch
+
+        A batch rejected with a permanent error is bisected until the bad
+        records are isolated; those are dead-lettered and the rest written.
+
+        Returns:
+            Records that failed with a transient error and should be retried
+        """
+        try:
+            saved = self._save_batch(batch)
+        except self.permanent_errors as e:
+            if len(batch) == 1:
+                user_email, prediction_data = batch[0]
+                print(f"Warning: Dead-lettering prediction for {user_email}: {e}")
+                self._dead_letter([{'user_email': user_email, 'data': prediction_data, 'error': str(e)}])
+                return []
+            with self._lock:
+                self._stats['split_batches'] += 1
+            middle = len(batch) // 2
+            return self._write(batch[:middle]) + self._write(batch[middle:])
+        except Exception as e:
+            print(f"Warning: Failed to write {len(batch)} predictions: {e}")
+            with self._lock:
+                self._stats['failed_batches'] += 1
+            return batch
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['written'] += sum(1 for ok in saved if ok)
+            self._stats['unknown_user'] += sum(1 for ok in saved if not ok)
+            self._stats['last_batch_size'] = len(batch)
+            self._stats['last_flush_at'] = time.time()
+        return []
+
+    def _replay_overflow(self):
+        """Insert records from the overflow file; keep them there on failure"""
+        overflow = self._path('overflow')
+        replay = self._path('replay')
+        with self._lock:
+            if not os.path.exists(replay):
+                if not os.path.exists(overflow):
+                    return
+                os.replace(overflow, replay)
+
+        with open(replay, encoding='utf-8') as f:
+            lines = [line.rstrip('\n') for line in f if line.strip()]
+
+        for start in range(0, len(lines), self.batch_size):
+            chunk = lines[start:start + self.batch_size]
+            batch = []
+            for line in chunk:
+                try:
+                    item = json.loads(line)
+                    batch.append((item['user_email'], item['data']))
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Warning: Dead-lettering malformed spilled prediction: {line[:80]}")
+                    self._dead_letter([{'line': line, 'error': f"malformed: {e}"}])
+            failed = self._write(batch) if batch else []
+            if failed:
+                # Still unavailable: keep what failed and everything after it
+                retry = [json.dumps({'user_email': e, 'data': d}) for e, d in failed]
+                with self._lock:
+                    self._append_lines(overflow, retry + lines[start + self.batch_size:])
+                    self._stats['replayed'] += len(batch) - len(failed)
+                os.remove(replay)
+                return
+            with self._lock:
+                self._stats['replayed'] += len(batch)
+        os.remove(replay)
+
+    def _run(self):
+        last_replay = 0.0
+        while True:
+            batch = self._collect()
+            if batch:
+                failed = self._write([(e, d) for e, d, _ in batch])
+                if failed:
+                    lines = [json.dumps({'user_email': e, 'data': d}) for e, d in failed]
+                    with self._lock:
+                        self._append_lines(self._path('overflow'), lines)
+                with self._lock:
+                    self._in_flight -= len(batch)
+                    self._release_segments(segment for _, _, segment in batch)
+
+            # Retry spilled records when idle, at most once per 10 flush intervals
+            now = time.monotonic()
+            if self._queue.empty() and now - last_replay > self.flush_interval * 10:
+                last_replay = now
+                try:
+                    self._replay_overflow()
+                except Exception as e:
+                    print(f"Warning: Failed to replay spilled predictions: {e}")
+
+    def stats(self):
+        """Return backlog and throughput metrics"""
+        with self._lock:
+            stats = dict(self._stats)
+            started = self._pid == os.getpid()
+            stats['backlog'] = self._queue.qsize() if started else 0
+            stats['journal_segments'] = len(self._segments) if started else 0
+        overflow = self._path('overflow') if started else None
+        stats['overflow_file_bytes'] = os.path.getsize(overflow) if overflow and os.path.exists(overflow) else 0
+        dead_letter = os.path.join(self.spill_dir, self.DEAD_LETTER_FILE)
+        stats['dead_letter_file_bytes'] = os.path.getsize(dead_letter) if os.path.exists(dead_letter) else 0
+        stats['batch_size'] = self.batch_size
+        stats['flush_interval'] = self.flush_interval
+        stats['max_queue'] = self.max_queue
+        return stats
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_writer = None
+
+
+def get_prediction_writer(save_batch_fn, spill_dir, **kwargs):
+    """Return the process-wide writer, creating it on first use"""
+    global _writer
+    if _writer is None:
+        _writer = PredictionWriter(save_batch_fn, spill_dir, **kwargs)
+        atexit.register(_writer.flush)
+    return _writer
@@ -0,0 +1,208 @@
+"""
+Hot-reloadable reference datasets (the files under backend/data)
+
+Each dataset is registered with the files it is built from and a loader
+that parses them into an immutable snapshot, including any derived
+indexes. A background thread polls the files' mtimes; when one changes,
+the loader runs on that thread and the finished snapshot replaces the old
+one in a single assignment. Requests always see a complete snapshot and
+never wait for a rebuild, and updated data goes live without restarting
+workers. If a reload fails, the previous snapshot stays active.
+
+Every snapshot carries a version: a short hash of its source files'
+contents, so workers that loaded the same files report the same version.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+from config import Config
+
+
+class Snapshot:
+    """One loaded version of a dataset"""
+
+    __slots__ = ('name', 'version', 'data', 'loaded_at')
+
+    def __init__(self, name, version, data, loaded_at):
+        self.name = name
+        self.version = version
+        self.data = data
+        self.loaded_at = loaded_at
+
+
+class ReferenceDataManager:
+    """
+    Registry of file-backed datasets with mtime-based reloading
+
+    Args:
+        poll_interval: Seconds between checks of the source files
+        watch: Run the background watcher (False = load once, never reload)
+    """
+
+    def __init__(self, poll_interval=5.0, watch=True):
+        self.poll_interval = poll_interval
+        self.watch = watch
+        self._datasets = {}
+        self._load_lock = threading.Lock()   # one load at a time
+        self._watcher_lock = threading.Lock()
+        self._pid = None
+        self._watcher = None
+
+    def register(self, name, paths, loader, versioned=False):
+        """
+        Register a dataset; it is loaded on first use
+
+        Args:
+            name: Dataset name
+            paths: Source file paths
+            loader: Callable taking the paths and returning the parsed data
+            versioned: Also pass the snapshot version to the loader as
+                `version=` (for data that embeds it, e.g. pre-serialized responses)
+        """
+        self._datasets[name] = {
+            'paths': list(paths),
+            'loader': loader,
+            'versioned': versioned,
+            'snapshot': None,
+            'signature': None,
+            'failed_signature': None,
+            'reloads': 0,
+            'failures': 0,
+            'last_error': None
+        }
+
+    # --- Loading ---------------------------------------------------------
+
+    def _signature(self, paths):
+        signature = []
+        for path in paths:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _content_version(self, paths):
+        digest = hashlib.sha256()
+        for path in paths:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        return digest.hexdigest()[:12]
+
+    def _load(self, name, force=False):
+        """Rebuild the dataset if its files changed; returns the active snapshot"""
+        dataset = self._datasets[name]
+        with self._load_lock:
+            current = dataset['snapshot']
+            signature = self._signature(dataset['paths'])
+            if current is not None and not force:
+                if signature in (dataset['signature'], dataset['failed_signature']):
+                    return current
+
+            version = self._content_version(dataset['paths'])
+            if current is not None and current.version == version and not force:
+                # Touched but not modified
+                dataset['signature'] = signature
+                return current
+
+            try:
+                if dataset['versioned']:
+                    data = dataset['loader'](*dataset['paths'], version=version)
+                else:
+                    data = dataset['loader'](*dataset['paths'])
+            except Exception as e:
+                dataset['failures'] += 1
+                dataset['last_error'] = str(e)
+                dataset['failed_signature'] = signature
+                if current is None:
+                    raise
+                print(f"Warning: Reload of {name} failed, keeping version {current.version}: {e}")
+                return current
+
+            snapshot = Snapshot(name, version, data, time.time())
+            # Single assignment: readers see either the old or the new snapshot
+            dataset['snapshot'] = snapshot
+            dataset['signature'] = signature
+            dataset['failed_signature'] = None
+            dataset['last_error'] = None
+            if current is not None:
+                dataset['reloads'] += 1
+                print(f"Reloaded {name}: version {current.version} -> {version}")
+            return snapshot
+
+    def get(self, name):
+        """Return the active snapshot of a dataset (loading it on first use)"""
+        self._ensure_watcher()
+        snapshot = self._datasets[name]['snapshot']
+        if snapshot is None:
+            snapshot = self._load(name)
+        return snapshot
+
+    def refresh(self, name=None, force=False):
+        """Check the source files now and reload changed datasets"""
+        names = [name] if name else list(self._datasets)
+        for dataset_name in names:
+            self._load(dataset_name, force=force)
+
+    # --- Watcher ---------------------------------------------------------
+
+    def _ensure_watcher(self):
+        # (Re)start after a fork; threads don't survive it
+        if not self.watch:
+            return
+        if self._pid == os.getpid() and self._watcher.is_alive():
+            return
+        with self._watcher_lock:
+            if self._pid == os.getpid() and self._watcher.is_alive():
+                return
+            self._pid = os.getpid()
+            self._watcher = threading.Thread(target=self._run, name='reference-data-watcher', daemon=True)
+            self._watcher.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            for name in list(self._datasets):
+                # Only datasets someone has used are kept fresh
+                if self._datasets[name]['snapshot'] is None:
+                    continue
+                try:
+                    self._load(name)
+                except Exception as e:
+                    print(f"Warning: Failed to check {name} for changes: {e}")
+
+    def stats(self):
+        """Return the active version and reload counters of each dataset"""
+        result = {}
+        for name, dataset in self._datasets.items():
+            snapshot = dataset['snapshot']
+            result[name] = {
+                'version': snapshot.version if snapshot else None,
+                'loaded_at': snapshot.loaded_at if snapshot else None,
+                'files': [os.path.basename(path) for path in dataset['paths']],
+                'reloads': dataset['reloads'],
+                'failures': dataset['failures'],
+                'last_error': dataset['last_error']
+            }
+        return result
+
+
+_manager = None
+
+
+def get_reference_data():
+    """Return the process-wide reference data manager"""
+    global _manager
+    if _manager is None:
+        _manager = ReferenceDataManager(
+            poll_interval=Config.REFERENCE_DATA_POLL_INTERVAL,
+            watch=Config.REFERENCE_DATA_WATCH
+        )
+    return _manager
+
+
+def data_path(filename):
+    """Path of a reference data file"""
+    return os.path.join(Config.REFERENCE_DATA_DIR, filename)
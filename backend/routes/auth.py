@@ -4,7 +4,7 @@ import os
 
 # Add parent directory to path to import auth_db
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from auth_db import create_user, get_user_by_email, verify_password, init_auth_db
+from auth_db import create_user, get_user_by_email, verify_password
 import re
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -124,9 +124,3 @@ def login():
     except Exception as e:
         print(f"Login error: {e}")
         return jsonify({"error": f"Server error: {str(e)}"}), 500
-
-# Initialize database on module load
-try:
-    init_auth_db()
-except Exception as e:
-    print(f"Failed to initialize auth database: {e}")
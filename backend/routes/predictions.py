@@ -4,10 +4,13 @@ import os
 
 # Add parent directory to path to import auth_db
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from auth_db import get_user_predictions, get_prediction_count
+from auth_db import get_user_predictions, get_user_predictions_page, get_prediction_count, get_prediction_summary
 
 predictions_bp = Blueprint('predictions', __name__, url_prefix='/api/predictions')
 
+# Largest page /history will return
+MAX_HISTORY_LIMIT = 100
+
 @predictions_bp.route('/history', methods=['GET'])
 def get_prediction_history():
     """
@@ -15,22 +18,33 @@ def get_prediction_history():
     
     Query params:
         email: User's email address (required)
-        limit: Number of predictions to return (default: 10)
+        limit: Number of predictions to return (default: 10, 1-100)
         offset: Number of predictions to skip (default: 0)
+        cursor: Opaque cursor for keyset pagination; pass it empty for the
+                first page and then the returned next_cursor (overrides offset)
     
     Returns:
-        List of predictions with details
+        List of predictions with details (plus next_cursor in cursor mode)
     """
     try:
         email = request.args.get('email')
         limit = int(request.args.get('limit', 10))
         offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor')
         
         if not email:
             return jsonify({"error": "Email parameter is required"}), 400
+        if not 1 <= limit <= MAX_HISTORY_LIMIT:
+            return jsonify({"error": f"limit must be between 1 and {MAX_HISTORY_LIMIT}"}), 400
+        if offset < 0:
+            return jsonify({"error": "offset must not be negative"}), 400
         
         # Get predictions
-        predictions = get_user_predictions(email, limit, offset)
+        next_cursor = None
+        if cursor is not None:
+            predictions, next_cursor = get_user_predictions_page(email, limit, cursor or None)
+        else:
+            predictions = get_user_predictions(email, limit, offset)
         
         # Convert Decimal to float for JSON serialization
         for pred in predictions:
@@ -38,11 +52,15 @@ def get_prediction_history():
                 if hasattr(value, 'is_integer'):  # Check if Decimal
                     pred[key] = float(value) if value is not None else None
         
-        return jsonify({
+        response = {
             "email": email,
             "predictions": predictions,
             "count": len(predictions)
-        }), 200
+        }
+        if cursor is not None:
+            response["next_cursor"] = next_cursor
+        
+        return jsonify(response), 200
         
     except ValueError as e:
         return jsonify({"error": f"Invalid parameter: {str(e)}"}), 400
@@ -78,3 +96,38 @@ def get_user_prediction_count():
     except Exception as e:
         print(f"Error getting prediction count: {e}")
         return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@predictions_bp.route('/summary', methods=['GET'])
+def get_user_prediction_summary():
+    """
+    Get dashboard summary for a user
+    
+    Query params:
+        email: User's email address (required)
+    
+    Returns:
+        Total count, last prediction and average predicted yield per crop
+    """
+    try:
+        email = request.args.get('email')
+        
+        if not email:
+            return jsonify({"error": "Email parameter is required"}), 400
+        
+        summary = get_prediction_summary(email)
+        
+        # Convert Decimal to float for JSON serialization
+        last = summary['last_prediction']
+        if last:
+            for key, value in last.items():
+                if hasattr(value, 'is_integer'):  # Check if Decimal
+                    last[key] = float(value) if value is not None else None
+        
+        return jsonify({
+            "email": email,
+            **summary
+        }), 200
+        
+    except Exception as e:
+        print(f"Error getting prediction summary: {e}")
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
@@ -3,12 +3,14 @@ Simple MySQL connection test
 """
 import mysql.connector
 from mysql.connector import Error
+from config import Config
 
-# Database configuration
+# Database configuration (same settings as the app, without selecting a database)
 DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': 'MySql@1546',
+    'host': Config.MYSQL_HOST,
+    'port': Config.MYSQL_PORT,
+    'user': Config.MYSQL_USER,
+    'password': Config.MYSQL_PASSWORD,
 }
 
 def test_connection():
@@ -27,16 +29,17 @@ def test_connection():
             
             cursor = connection.cursor()
             
-            # Check if crop_yield database exists
-            cursor.execute("SHOW DATABASES LIKE 'crop_yield';")
+            # Check if the application database exists
+            database = Config.MYSQL_DATABASE
+            cursor.execute("SHOW DATABASES LIKE %s", (database,))
             db_exists = cursor.fetchone()
             
             if db_exists:
-                print("SUCCESS: Database 'crop_yield' exists")
+                print(f"SUCCESS: Database '{database}' exists")
             else:
-                print("WARNING: Database 'crop_yield' does NOT exist")
-                print("Creating database 'crop_yield'...")
-                cursor.execute("CREATE DATABASE crop_yield;")
+                print(f"WARNING: Database '{database}' does NOT exist")
+                print(f"Creating database '{database}'...")
+                cursor.execute(f"CREATE DATABASE {database};")
                 print("SUCCESS: Database created")
             
             cursor.close()
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# Backend modules import each other as top-level modules (python app.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def client():
+    """Flask test client for the full app"""
+    pytest.importorskip('flask')
+    from app import app
+    app.testing = True
+    return app.test_client()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """auth_db wired to an in-memory database with one user, a@x"""
+    pytest.importorskip('mysql.connector')
+    import auth_db
+    from fake_mysql import FakeDatabase
+    database = FakeDatabase(users=['a@x'])
+    monkeypatch.setattr(auth_db, '_checkout_connection', database.connect)
+    return database
@@ -0,0 +1,114 @@
+"""
+In-memory stand-in for the MySQL connection used by auth_db
+
+Understands just the prepared statements auth_db runs for predictions
+(insert, summary upsert, history pages, summary rows), so route tests can
+exercise the real query flow without a server.
+"""
+
+from datetime import datetime, timedelta
+
+import auth_db
+
+
+class FakeDatabase:
+    def __init__(self, users=()):
+        self.users = {email.lower() for email in users}
+        self.predictions = []
+        self.summaries = {}
+        self.commits = 0
+        self._clock = datetime(2026, 1, 1, 12, 0, 0)
+
+    def add_prediction(self, email, crop='Wheat', predicted_yield=10.0, created_at=None):
+        row = {
+            'id': len(self.predictions) + 1, 'user_email': email, 'crop': crop,
+            'soil_type': None, 'season': None, 'area': 1.0, 'N': None, 'P': None, 'K': None,
+            'ph': None, 'state': None, 'predicted_yield': predicted_yield,
+            'total_yield': predicted_yield, 'created_at': created_at or self._tick()
+        }
+        self.predictions.append(row)
+        return row
+
+    def _tick(self):
+        self._clock += timedelta(seconds=1)
+        return self._clock
+
+    def connect(self):
+        return FakeConnection(self)
+
+    def _history(self, email):
+        rows = [row for row in self.predictions if row['user_email'] == email]
+        return sorted(rows, key=lambda row: (row['created_at'], row['id']), reverse=True)
+
+    def execute(self, query, params):
+        """Returns (rows, rowcount, lastrowid)"""
+        if query == auth_db.INSERT_PREDICTION_QUERY:
+            *values, email = params
+            if email not in self.users:
+                return [], 0, 0
+            crop, soil_type, season, area, n, p, k, ph, state, predicted_yield, total_yield = values
+            row = self.add_prediction(email, crop, predicted_yield)
+            row.update(soil_type=soil_type, season=season, area=area, N=n, P=p, K=k, ph=ph,
+                       state=state, total_yield=total_yield)
+            return [], 1, row['id']
+        if query == auth_db.SUMMARY_UPSERT_QUERY:
+            email, crop, count, total = params
+            summary = self.summaries.setdefault((email, crop), {
+                'crop': crop, 'prediction_count': 0, 'total_predicted_yield': 0.0
+            })
+            summary['prediction_count'] += count
+            summary['total_predicted_yield'] += total
+            summary['last_prediction_at'] = self._tick()
+            return [], 1, 0
+        if query == auth_db.HISTORY_FIRST_PAGE_QUERY:
+            email, limit = params
+            return self._history(email)[:limit], 0, 0
+        if query == auth_db.HISTORY_AFTER_CURSOR_QUERY:
+            email, created_at, _, prediction_id, limit = params
+            rows = [row for row in self._history(email)
+                    if (row['created_at'], row['id']) < (created_at, prediction_id)]
+            return rows[:limit], 0, 0
+        if query == auth_db.HISTORY_OFFSET_QUERY:
+            email, limit, offset = params
+            return self._history(email)[offset:offset + limit], 0, 0
+        if query == auth_db.SUMMARY_ROWS_QUERY:
+            (email,) = params
+            rows = [dict(summary) for (user, _), summary in self.summaries.items() if user == email]
+            return sorted(rows, key=lambda row: row['last_prediction_at'], reverse=True), 0, 0
+        raise AssertionError(f"Unexpected query: {query}")
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rowcount = 0
+        self.lastrowid = None
+        self.column_names = ()
+        self._rows = []
+
+    def execute(self, query, params=()):
+        rows, self.rowcount, self.lastrowid = self.database.execute(query, params)
+        self.column_names = tuple(rows[0]) if rows else ()
+        self._rows = [tuple(row.values()) for row in rows]
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+        self.statements = {}
+
+    def cursor(self, prepared=False):
+        return FakeCursor(self.database)
+
+    def commit(self):
+        self.database.commits += 1
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip('mysql.connector')
+
+import mysql.connector
+
+import auth_db
+
+PREDICTION = {'crop': 'Wheat', 'area': 2.0, 'predicted_yield': 7.5, 'total_yield': 7.5}
+
+
+def test_save_prediction_inserts_and_updates_summary(fake_db):
+    prediction_id = auth_db.save_prediction('A@x', PREDICTION)
+
+    assert prediction_id == 1
+    assert fake_db.predictions[0]['user_email'] == 'a@x'
+    assert fake_db.summaries[('a@x', 'Wheat')]['prediction_count'] == 1
+    assert fake_db.commits == 1
+
+
+def test_save_prediction_for_unknown_user(fake_db):
+    with pytest.raises(ValueError, match="does not exist"):
+        auth_db.save_prediction('nobody@x', PREDICTION)
+
+    assert fake_db.predictions == []
+    assert fake_db.summaries == {}
+    assert fake_db.commits == 0
+
+
+def test_save_prediction_maps_fk_violation_to_unknown_user(fake_db, monkeypatch):
+    # The user was deleted between the INSERT's SELECT and the FK check
+    def execute(query, params):
+        raise mysql.connector.IntegrityError(msg="Cannot add or update a child row", errno=1452)
+
+    monkeypatch.setattr(fake_db, 'execute', execute)
+
+    with pytest.raises(ValueError, match="does not exist"):
+        auth_db.save_prediction('a@x', PREDICTION)
+
+
+def test_save_prediction_other_integrity_errors_are_database_errors(fake_db, monkeypatch):
+    def execute(query, params):
+        raise mysql.connector.IntegrityError(msg="Column 'crop' cannot be null", errno=1048)
+
+    monkeypatch.setattr(fake_db, 'execute', execute)
+
+    with pytest.raises(Exception, match="Database error") as info:
+        auth_db.save_prediction('a@x', PREDICTION)
+    assert not isinstance(info.value, ValueError)
@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip('mysql.connector')
+
+import auth_db
+import db
+from config import Config
+
+
+@pytest.fixture
+def schema(monkeypatch):
+    """Fresh schema state with get_schema_version/init_db stubbed out"""
+    state = {'version': 0, 'version_calls': 0, 'migrations': 0}
+
+    def get_schema_version():
+        state['version_calls'] += 1
+        if isinstance(state['version'], Exception):
+            raise state['version']
+        return state['version']
+
+    def init_db():
+        state['migrations'] += 1
+
+    monkeypatch.setattr(db, '_schema_ready', False)
+    monkeypatch.setattr(db, '_schema_failure', None)
+    monkeypatch.setattr(db, 'get_schema_version', get_schema_version)
+    monkeypatch.setattr(db, 'init_db', init_db)
+    monkeypatch.setattr(Config, 'DB_AUTO_MIGRATE', False)
+    monkeypatch.setattr(Config, 'DB_SCHEMA_RETRY_INTERVAL', 60)
+    return state
+
+
+def test_schema_behind_is_a_graceful_unavailable_database(schema):
+    with pytest.raises(db.SchemaNotReady):
+        db.ensure_schema()
+    assert auth_db.get_db_connection() is None
+
+
+def test_failed_check_is_cached_for_the_retry_interval(schema):
+    schema['version'] = db.Error(msg="Can't connect to MySQL server")
+    for _ in range(5):
+        assert auth_db.get_db_connection() is None
+
+    assert schema['version_calls'] == 1
+
+
+def test_history_route_survives_an_unready_schema(schema, client):
+    response = client.get('/api/predictions/history', query_string={'email': 'a@x'})
+
+    assert response.status_code == 200
+    assert response.get_json()['predictions'] == []
+
+
+def test_readiness_never_migrates(schema, monkeypatch):
+    monkeypatch.setattr(Config, 'DB_AUTO_MIGRATE', True)
+
+    status = db.get_schema_status()
+
+    assert status['ready'] and status['migration_pending']
+    assert schema['migrations'] == 0
+
+
+def test_readiness_reports_version(schema, client):
+    response = client.get('/api/ready')
+
+    assert response.status_code == 503
+    payload = response.get_json()
+    assert payload['schema_version'] == 0
+    assert payload['expected_schema_version'] == db.SCHEMA_VERSION
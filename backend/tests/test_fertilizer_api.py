@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip('sklearn')
+
+from models.fertilizer_model import extract_fertilizer_features
+
+ROW = {'temperature': 26, 'humidity': 52, 'moisture': 38, 'N': 37, 'K': 0, 'P': 0,
+       'soil_type': 'Sandy', 'crop': 'Maize'}
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', float('-inf')])
+def test_extract_fertilizer_features_rejects_non_finite_values(value):
+    with pytest.raises(ValueError, match="'moisture'"):
+        extract_fertilizer_features(dict(ROW, moisture=value))
+
+
+def test_single_recommendation(client):
+    response = client.post('/api/recommend_fertilizer', json=ROW)
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['fertilizer']
+    assert payload['dataset_version'] == response.headers['X-Dataset-Version']
+
+
+def test_single_recommendation_with_nan_is_a_400(client):
+    response = client.post('/api/recommend_fertilizer', json=dict(ROW, N='nan'))
+
+    assert response.status_code == 400
+    assert "'N'" in response.get_json()['error']
+
+
+def test_batch_with_mixed_rows_reports_row_errors(client):
+    records = [ROW, dict(ROW, humidity='nan'), dict(ROW, P='inf'), {'N': 1}, 'junk', dict(ROW, crop='Paddy')]
+    response = client.post('/api/recommend_fertilizer', json={'records': records})
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    results = payload['results']
+    assert [r['index'] for r in results] == list(range(6))
+    assert payload['errors'] == 4
+    assert results[0]['fertilizer'] and results[5]['fertilizer']
+    assert "'humidity'" in results[1]['error']
+    assert "'P'" in results[2]['error']
+    assert results[3]['error'].startswith('Missing field')
+    assert results[4]['error'] == "Record must be an object"
+
+
+def test_batch_csv_with_inf_row(client):
+    body = (
+        "temperature,humidity,moisture,N,K,P,soil_type,crop\n"
+        "26,52,38,37,0,0,Sandy,Maize\n"
+        "26,52,inf,37,0,0,Sandy,Maize\n"
+    )
+    response = client.post('/api/recommend_fertilizer', data=body, content_type='text/csv')
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert 'fertilizer' in results[0]
+    assert "'moisture'" in results[1]['error']
@@ -0,0 +1,34 @@
+import io
+
+import pytest
+
+pytest.importorskip('PIL')
+
+from PIL import Image
+
+
+def upload(client, data, filename='leaf.jpg'):
+    return client.post(
+        '/api/analyze_health',
+        data={'image': (io.BytesIO(data), filename)},
+        content_type='multipart/form-data'
+    )
+
+
+def test_non_image_upload_gets_a_fixed_message(client):
+    response = upload(client, b'this is not an image')
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Uploaded file is not a valid image"}
+
+
+def test_image_upload_is_described(client):
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), (30, 120, 40)).save(buffer, 'JPEG')
+
+    response = upload(client, buffer.getvalue())
+
+    assert response.status_code == 200
+    image = response.get_json()['image']
+    assert (image['width'], image['height']) == (640, 480)
+    assert image['bytes'] == len(buffer.getvalue())
@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('requests')
+
+from http_client import HTTPClient
+from weather_service import OpenWeatherProvider, WeatherService
+
+
+class Upstream:
+    """Local HTTP server; `responses` is a list of (status, headers, body) served in order"""
+
+    def __init__(self, responses=None, delay=0.0):
+        self.responses = list(responses or [])
+        self.delay = delay
+        self.requests = []
+        self.client_ports = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        lock = threading.Lock()
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'   # keep-alive
+
+            def do_GET(self):
+                with lock:
+                    upstream.requests.append(self.path)
+                    upstream.client_ports.add(self.client_address[1])
+                    upstream.in_flight += 1
+                    upstream.max_in_flight = max(upstream.max_in_flight, upstream.in_flight)
+                if upstream.delay:
+                    time.sleep(upstream.delay)
+                with lock:
+                    upstream.in_flight -= 1
+                status, headers, body = upstream.responses.pop(0) if upstream.responses else (200, {}, {'ok': True})
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def upstream():
+    servers = []
+
+    def start(*args, **kwargs):
+        server = Upstream(*args, **kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def test_retry_after_wait_is_capped_at_read_timeout(upstream):
+    server = upstream([(429, {'Retry-After': '3600'}, {}), (200, {}, {'ok': True})])
+    client = HTTPClient('test', read_timeout=0.5, retries=1, backoff=0)
+
+    start = time.monotonic()
+    assert client.get_json(server.url + '/x') == {'ok': True}
+
+    assert time.monotonic() - start < 5
+    assert len(server.requests) == 2
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_sequential_calls_reuse_one_connection(upstream):
+    server = upstream()
+    client = HTTPClient('test', pool_size=2)
+
+    for _ in range(5):
+        client.get_json(server.url + '/x')
+
+    assert len(server.requests) == 5
+    assert len(server.client_ports) == 1
+    assert client.stats()['requests'] == 5
+
+
+def test_concurrency_is_bounded(upstream):
+    server = upstream(delay=0.05)
+    client = HTTPClient('test', pool_size=8, max_concurrency=2)
+
+    run_threads(8, lambda: client.get_json(server.url + '/x'))
+
+    assert len(server.requests) == 8
+    assert server.max_in_flight <= 2
+
+
+def test_weather_lookups_for_one_cell_make_one_upstream_call(upstream):
+    body = {'main': {'temp': 24.5, 'humidity': 61}, 'rain': {'1h': 2.0}}
+    server = upstream([(200, {}, body)], delay=0.2)
+    provider = OpenWeatherProvider('key', HTTPClient('weather-test'), base_url=server.url)
+    service = WeatherService(provider)
+    results = []
+
+    run_threads(10, lambda: results.append(service.get(28.61, 77.21)))
+
+    assert len(server.requests) == 1
+    assert server.requests[0].startswith('/data/2.5/weather?')
+    assert [value for value, _, _ in results] == [{'rainfall': 2.0, 'temperature': 24.5, 'humidity': 61.0}] * 10
+    assert service.stats()['coalesced'] == 9
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+pytest.importorskip('geopandas')
+
+BAD_POINTS = [{'lat': 'nan', 'lon': 70}, [1e9, 5], [23.0, 'inf'], [91, 0], {'lat': 1}, 'junk']
+
+
+def read_ndjson(response):
+    # Strict parsing: NaN/Infinity are not valid JSON
+    def reject(constant):
+        raise ValueError(f"invalid JSON constant {constant}")
+    return [json.loads(line, parse_constant=reject) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_bulk_location_reports_invalid_points_per_row(client, monkeypatch):
+    import app
+    resolved = []
+
+    def fake_lookup(points):
+        # The district GeoJSON is not shipped with the repo
+        resolved.extend(points)
+        return [{'district': 'Ahmadabad', 'state': 'Gujarat'} for _ in points]
+
+    monkeypatch.setattr(app, 'get_districts_for_points', fake_lookup)
+    response = client.post('/api/location/bulk', json={'points': [[23.02, 72.57]] + BAD_POINTS})
+
+    assert response.status_code == 200
+    rows = read_ndjson(response)
+    assert [row['index'] for row in rows] == list(range(len(BAD_POINTS) + 1))
+    assert rows[0]['lat'] == 23.02 and rows[0]['district'] == 'Ahmadabad'
+    assert resolved == [(23.02, 72.57)]
+    for row in rows[1:]:
+        assert set(row) == {'index', 'error'}
+        assert row['error'].startswith('Invalid point')
+
+
+def test_bulk_weather_uses_the_same_point_filter(client):
+    response = client.post('/api/weather', json={'points': BAD_POINTS})
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['errors'] == len(BAD_POINTS)
+    assert all(row['error'].startswith('Invalid point') for row in payload['results'])
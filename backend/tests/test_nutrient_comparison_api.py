@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip('pandas')
+
+
+def single(client, state, crop):
+    response = client.post('/api/nutrient-comparison', json={'state': state, 'crop': crop})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['nutrient_comparison']
+
+
+def matrix(client, state, crop):
+    response = client.get('/api/nutrient-comparison/matrix', query_string={'state': state, 'crop': crop})
+    assert response.status_code == 200
+    return response.get_json()['rows']
+
+
+@pytest.mark.parametrize('crop', ['Sorghum', 'Wheat', 'paddy'])
+def test_single_endpoint_matches_matrix_rows(client, crop):
+    rows = single(client, 'Gujarat', crop)
+    matrix_rows = matrix(client, 'Gujarat', crop)
+
+    assert len(rows) == len(matrix_rows) == 3
+    for row, matrix_row in zip(rows, matrix_rows):
+        assert matrix_row['state'] == 'Gujarat'
+        assert {key: matrix_row[key] for key in row} == row
+
+
+def test_zero_requirement_is_not_required(client):
+    rows = {row['nutrient']: row for row in single(client, 'Gujarat', 'Sorghum')}
+
+    assert rows['Potassium'] == {
+        'nutrient': 'Potassium',
+        'crop_required': 0,
+        'state_available': 0.0,
+        'percentage': None,
+        'status': 'Not required'
+    }
+
+
+def test_unknown_crop_is_a_404(client):
+    response = client.post('/api/nutrient-comparison', json={'state': 'Gujarat', 'crop': 'Dragonfruit'})
+    assert response.status_code == 404
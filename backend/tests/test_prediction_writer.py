@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+
+from prediction_writer import PredictionWriter
+
+
+class FakeStore:
+    """save_batch_fn that rejects records without a crop, like the NOT NULL column"""
+
+    def __init__(self):
+        self.rows = []
+        self.calls = 0
+        self.down = False
+
+    def save(self, batch):
+        self.calls += 1
+        if self.down:
+            raise Exception("Database error: connection refused")
+        if any(data.get('crop') is None for _, data in batch):
+            raise ValueError("Column 'crop' cannot be null")
+        self.rows.extend(batch)
+        return [True] * len(batch)
+
+
+def read_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def make_writer(store, tmp_path, **kwargs):
+    kwargs.setdefault('flush_interval', 0.05)
+    return PredictionWriter(store.save, str(tmp_path), **kwargs)
+
+
+def test_bad_record_does_not_block_its_batch(tmp_path):
+    store = FakeStore()
+    writer = make_writer(store, tmp_path)
+    batch = [('a@x', {'crop': 'Wheat'}), ('b@x', {'crop': None}), ('c@x', {'crop': 'Rice'})]
+
+    assert writer._write(batch) == []
+
+    assert [email for email, _ in store.rows] == ['a@x', 'c@x']
+    dead = read_lines(tmp_path / PredictionWriter.DEAD_LETTER_FILE)
+    assert [entry['user_email'] for entry in dead] == ['b@x']
+    assert 'cannot be null' in dead[0]['error']
+    assert writer.stats()['dead_lettered'] == 1
+
+
+def test_transient_failure_keeps_records_for_retry(tmp_path):
+    store = FakeStore()
+    store.down = True
+    writer = make_writer(store, tmp_path)
+    batch = [('a@x', {'crop': 'Wheat'}), ('b@x', {'crop': 'Rice'})]
+
+    assert writer._write(batch) == batch
+    assert not os.path.exists(tmp_path / PredictionWriter.DEAD_LETTER_FILE)
+
+
+def test_replay_writes_valid_records_and_dead_letters_bad_ones(tmp_path):
+    store = FakeStore()
+    writer = make_writer(store, tmp_path, batch_size=2)
+    writer._pid, writer._token = os.getpid(), 'test'
+    lines = [json.dumps({'user_email': f"{i}@x", 'data': {'crop': None if i == 1 else 'Wheat'}}) for i in range(5)]
+    writer._append_lines(writer._path('overflow'), lines + ['not json'])
+
+    writer._replay_overflow()
+
+    assert sorted(email for email, _ in store.rows) == ['0@x', '2@x', '3@x', '4@x']
+    assert len(read_lines(tmp_path / PredictionWriter.DEAD_LETTER_FILE)) == 2
+    assert not os.path.exists(writer._path('overflow'))
+
+
+def test_replay_during_outage_keeps_unwritten_records(tmp_path):
+    store = FakeStore()
+    writer = make_writer(store, tmp_path, batch_size=2)
+    writer._pid, writer._token = os.getpid(), 'test'
+    lines = [json.dumps({'user_email': f"{i}@x", 'data': {'crop': 'Wheat'}}) for i in range(5)]
+    writer._append_lines(writer._path('overflow'), lines)
+    store.down = True
+
+    writer._replay_overflow()
+
+    assert [entry['user_email'] for entry in read_lines(writer._path('overflow'))] == [f"{i}@x" for i in range(5)]
+
+
+def test_journal_left_under_our_pid_is_replayed(tmp_path):
+    # A dead process with our PID left an unflushed journal behind
+    leftover = tmp_path / f"predictions-{os.getpid()}.journal"
+    leftover.write_text(json.dumps({'user_email': 'old@x', 'data': {'crop': 'Wheat'}}) + '\n')
+    store = FakeStore()
+    writer = make_writer(store, tmp_path)
+
+    writer.submit('new@x', {'crop': 'Rice'})
+    writer.flush()
+    # The worker replays adopted records as soon as it is idle
+    wait_for(lambda: len(store.rows) == 2)
+
+    assert sorted(email for email, _ in store.rows) == ['new@x', 'old@x']
+    assert not leftover.exists()
+
+
+def test_live_process_files_are_not_adopted(tmp_path):
+    # PID 1 is always alive
+    foreign = tmp_path / "predictions-1-abc.overflow"
+    foreign.write_text(json.dumps({'user_email': 'other@x', 'data': {'crop': 'Wheat'}}) + '\n')
+    writer = make_writer(FakeStore(), tmp_path)
+
+    writer._ensure_worker()
+
+    assert foreign.exists()
+    assert not os.path.exists(writer._path('overflow'))
+
+
+def journal_files(tmp_path):
+    return sorted(p.name.rsplit('.', 1)[1] for p in tmp_path.glob('predictions-*.journal-*'))
+
+
+def test_journal_segments_are_dropped_once_written_under_steady_traffic(tmp_path):
+    store = FakeStore()
+    gate = threading.Semaphore(0)
+
+    def save(batch):
+        gate.acquire(timeout=5)
+        return store.save(batch)
+
+    writer = PredictionWriter(save, str(tmp_path), batch_size=5, flush_interval=0.05)
+    for i in range(12):
+        writer.submit(f"{i}@x", {'crop': 'Wheat'})
+    assert journal_files(tmp_path) == ['journal-0', 'journal-1', 'journal-2']
+
+    # First batch written while the queue is still busy: its segment goes away
+    gate.release()
+    assert wait_for(lambda: 'journal-0' not in journal_files(tmp_path))
+    assert writer.stats()['backlog'] > 0
+
+    for _ in range(5):
+        gate.release()
+    writer.flush()
+    assert len(store.rows) == 12
+    assert journal_files(tmp_path) == ['journal-2']
+    assert (tmp_path / f"predictions-{writer._pid}-{writer._token}.journal-2").read_text() == ''
@@ -0,0 +1,96 @@
+import pytest
+
+pytest.importorskip('mysql.connector')
+
+
+def history(client, **params):
+    params.setdefault('email', 'a@x')
+    return client.get('/api/predictions/history', query_string=params)
+
+
+def test_cursor_pages_cover_every_prediction_once(client, fake_db):
+    first = fake_db.add_prediction('a@x')
+    # Same timestamp: the id breaks the tie
+    for _ in range(3):
+        fake_db.add_prediction('a@x', created_at=first['created_at'])
+    for _ in range(3):
+        fake_db.add_prediction('a@x')
+    fake_db.add_prediction('other@x')
+
+    seen = []
+    cursor = ''
+    pages = 0
+    while cursor is not None:
+        response = history(client, limit=2, cursor=cursor)
+        assert response.status_code == 200
+        payload = response.get_json()
+        assert payload['count'] == len(payload['predictions']) <= 2
+        seen.extend(p['id'] for p in payload['predictions'])
+        cursor = payload['next_cursor']
+        pages += 1
+
+    assert seen == [7, 6, 5, 4, 3, 2, 1]
+    assert pages == 4
+
+
+def test_offset_mode_has_no_cursor(client, fake_db):
+    for _ in range(3):
+        fake_db.add_prediction('a@x')
+
+    payload = history(client, limit=2, offset=1).get_json()
+
+    assert [p['id'] for p in payload['predictions']] == [2, 1]
+    assert 'next_cursor' not in payload
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', 'bm90IGpzb24=', 'WyJ4IiwgMV0='])
+def test_bad_cursor_is_a_400(client, fake_db, cursor):
+    response = history(client, cursor=cursor)
+
+    assert response.status_code == 400
+    assert 'Invalid' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('params', [
+    {'limit': 0}, {'limit': -1}, {'limit': 101}, {'limit': 'ten'},
+    {'offset': -1}, {'limit': 0, 'cursor': ''}
+])
+def test_out_of_range_limit_and_offset_are_400(client, fake_db, params):
+    assert history(client, **params).status_code == 400
+
+
+@pytest.mark.parametrize('limit', [1, 100])
+def test_limit_bounds_are_inclusive(client, fake_db, limit):
+    assert history(client, limit=limit).status_code == 200
+
+
+def test_history_requires_email(client, fake_db):
+    assert client.get('/api/predictions/history').status_code == 400
+
+
+def test_summary_shape_follows_saved_predictions(client, fake_db):
+    import auth_db
+    for crop, predicted_yield in (('Wheat', 6.0), ('Wheat', 8.0), ('Rice', 5.0)):
+        auth_db.save_prediction('a@x', {'crop': crop, 'area': 1.0, 'predicted_yield': predicted_yield})
+
+    response = client.get('/api/predictions/summary', query_string={'email': 'a@x'})
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert set(payload) == {'email', 'count', 'last_prediction', 'crops'}
+    assert payload['email'] == 'a@x'
+    assert payload['count'] == 3
+    assert payload['last_prediction']['id'] == 3
+    assert payload['last_prediction']['crop'] == 'Rice'
+    crops = {row['crop']: row for row in payload['crops']}
+    assert set(crops['Wheat']) == {'crop', 'count', 'average_predicted_yield', 'last_prediction_at'}
+    assert (crops['Wheat']['count'], crops['Wheat']['average_predicted_yield']) == (2, 7.0)
+    assert (crops['Rice']['count'], crops['Rice']['average_predicted_yield']) == (1, 5.0)
+    # Most recently used crop first
+    assert [row['crop'] for row in payload['crops']] == ['Rice', 'Wheat']
+
+
+def test_summary_for_user_without_predictions(client, fake_db):
+    payload = client.get('/api/predictions/summary', query_string={'email': 'a@x'}).get_json()
+
+    assert (payload['count'], payload['last_prediction'], payload['crops']) == (0, None, [])
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+
+import weather_service
+from weather_service import StubWeatherProvider, WeatherService, WeatherUnavailable
+
+
+class FakeClock:
+    """Stands in for the time module inside weather_service"""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class FlakyProvider(StubWeatherProvider):
+    def __init__(self, delay=0.0):
+        super().__init__(delay)
+        self.down = False
+
+    def fetch(self, lat, lon):
+        if self.down:
+            self.calls += 1
+            raise ConnectionError("upstream down")
+        return super().fetch(lat, lon)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(weather_service, 'time', clock)
+    return clock
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_concurrent_misses_share_one_provider_call(clock):
+    provider = StubWeatherProvider(delay=0.2)
+    service = WeatherService(provider, ttl=600, stale_ttl=1800)
+    results = []
+
+    def lookup():
+        results.append(service.get(28.61, 77.21))
+
+    threads = [threading.Thread(target=lookup) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert provider.calls == 1
+    assert len({tuple(sorted(value.items())) for value, _, _ in results}) == 1
+    assert all(status == 'miss' for _, status, _ in results)
+    stats = service.stats()
+    assert stats['misses'] == 1
+    assert stats['coalesced'] == 19
+
+
+def test_nearby_points_hit_the_same_cell(clock):
+    provider = StubWeatherProvider()
+    service = WeatherService(provider, precision=5, ttl=600)
+
+    _, first, cell = service.get(28.6100, 77.2100)
+    _, second, other_cell = service.get(28.6101, 77.2101)
+
+    assert (first, second) == ('miss', 'hit')
+    assert cell == other_cell
+    assert provider.calls == 1
+
+
+def test_stale_value_is_served_while_one_refresh_runs(clock):
+    provider = StubWeatherProvider(delay=0.1)
+    service = WeatherService(provider, ttl=600, stale_ttl=1800)
+    value, _, _ = service.get(28.61, 77.21)
+
+    clock.now += 600
+    statuses = [service.get(28.61, 77.21)[1] for _ in range(5)]
+
+    assert statuses == ['stale'] * 5
+    assert wait_for(lambda: service.stats()['inflight'] == 0)
+    assert provider.calls == 2
+    assert service.stats()['refreshes'] == 1
+    assert service.get(28.61, 77.21)[1] == 'hit'
+
+
+def test_expired_value_is_fetched_again(clock):
+    provider = StubWeatherProvider()
+    service = WeatherService(provider, ttl=600, stale_ttl=1800)
+    service.get(28.61, 77.21)
+
+    clock.now += 600 + 1800 + 1
+
+    assert service.get(28.61, 77.21)[1] == 'miss'
+    assert provider.calls == 2
+
+
+def test_outage_serves_stale_values_then_fails(clock):
+    provider = FlakyProvider()
+    service = WeatherService(provider, ttl=600, stale_ttl=1800)
+    value, _, _ = service.get(28.61, 77.21)
+    provider.down = True
+
+    clock.now += 600
+    assert service.get(28.61, 77.21)[:2] == (value, 'stale')
+    assert wait_for(lambda: service.stats()['provider_errors'] == 1)
+    assert service.get(28.61, 77.21)[:2] == (value, 'stale')
+
+    with pytest.raises(WeatherUnavailable):
+        service.get(-33.87, 151.21)
+
+
+def test_get_many_looks_up_each_cell_once(clock):
+    provider = StubWeatherProvider()
+    service = WeatherService(provider, precision=5)
+    points = [(28.6100, 77.2100), (28.6101, 77.2101), (19.07, 72.87), (13.08, 80.27)]
+
+    results = service.get_many(points)
+
+    assert provider.calls == 3
+    assert results[0][0] == results[1][0]
+    assert [cell for _, _, cell in results] == [service.cell_for(*point) for point in points]
@@ -0,0 +1,60 @@
+import math
+
+import pytest
+
+pytest.importorskip('sklearn')
+
+from models.yield_model import extract_features
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf', float('nan'), float('inf')])
+def test_extract_features_rejects_non_finite_values(value):
+    with pytest.raises(ValueError, match="'N'"):
+        extract_features({'N': value})
+
+
+def test_extract_features_fills_defaults():
+    features = extract_features({'N': '90', 'area': 2})
+    assert features[0] == 90.0 and features[7] == 2.0
+    assert all(math.isfinite(f) for f in features)
+
+
+def test_batch_csv_with_non_finite_rows_reports_row_errors(client):
+    body = (
+        "N,P,K,temperature,humidity,ph,rainfall,area\n"
+        "90,42,43,21,82,6.5,203,2\n"
+        "inf,42,43,21,82,6.5,203,2\n"
+        "90,nan,43,21,82,6.5,203,2\n"
+        "abc,42,43,21,82,6.5,203,2\n"
+        "60,55,44,23,82,7.8,263,1\n"
+    )
+    response = client.post('/api/predict_yield/batch', data=body, content_type='text/csv')
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['count'] == 5
+    assert payload['errors'] == 3
+    results = payload['results']
+    assert [r['index'] for r in results] == [0, 1, 2, 3, 4]
+    for index in (0, 4):
+        assert math.isfinite(results[index]['total_yield'])
+    for index, field in ((1, 'N'), (2, 'P'), (3, 'N')):
+        assert f"'{field}'" in results[index]['error']
+
+
+def test_batch_json_records_with_mixed_rows(client):
+    records = [{'N': 90, 'area': 1}, 'not an object', {'K': 'inf'}]
+    response = client.post('/api/predict_yield/batch', json={'records': records})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert 'total_yield' in results[0]
+    assert results[1]['error'] == "Record must be an object"
+    assert "'K'" in results[2]['error']
+
+
+def test_single_prediction_rejects_non_finite_value_with_400(client):
+    response = client.post('/api/predict_yield', json={'N': 'nan', 'area': 1})
+
+    assert response.status_code == 400
+    assert "'N'" in response.get_json()['error']
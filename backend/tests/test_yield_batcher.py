@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from models.yield_batcher import PredictionBatcher
+
+
+def run_concurrently(fn, args):
+    results = [None] * len(args)
+    errors = [None] * len(args)
+    start = threading.Barrier(len(args))
+
+    def call(i):
+        start.wait()
+        try:
+            results[i] = fn(args[i])
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(args))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_rows_share_a_batch_and_get_their_own_result():
+    calls = []
+
+    def predict(rows):
+        calls.append(len(rows))
+        return [row * 10 for row in rows]
+
+    batcher = PredictionBatcher(predict, window_ms=100, max_rows=64)
+    results, errors = run_concurrently(batcher.submit, list(range(16)))
+
+    assert errors == [None] * 16
+    assert results == [row * 10 for row in range(16)]
+    assert sum(calls) == 16
+    assert len(calls) < 16
+    stats = batcher.get_stats()
+    assert stats['requests'] == 16
+    assert stats['batches'] == len(calls)
+
+
+def test_batches_are_capped_at_max_rows():
+    calls = []
+
+    def predict(rows):
+        calls.append(len(rows))
+        return rows
+
+    batcher = PredictionBatcher(predict, window_ms=200, max_rows=4)
+    run_concurrently(batcher.submit, list(range(12)))
+
+    assert max(calls) <= 4
+    assert sum(calls) == 12
+
+
+def test_model_error_reaches_every_caller_in_the_batch():
+    def predict(rows):
+        raise RuntimeError("model exploded")
+
+    batcher = PredictionBatcher(predict, window_ms=50)
+    _, errors = run_concurrently(batcher.submit, [1, 2, 3])
+
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert batcher.get_stats()['errors'] >= 1
+
+
+def test_submit_times_out_when_the_model_hangs():
+    release = threading.Event()
+
+    def predict(rows):
+        release.wait()
+        return rows
+
+    batcher = PredictionBatcher(predict, window_ms=1, timeout=0.1)
+    try:
+        with pytest.raises(TimeoutError):
+            batcher.submit(1)
+    finally:
+        release.set()
+
+
+def test_failed_batch_is_retried_row_by_row():
+    calls = []
+
+    def predict(rows):
+        calls.append(len(rows))
+        if any(row < 0 for row in rows):
+            raise ValueError("Input X contains infinity")
+        return [row * 10 for row in rows]
+
+    batcher = PredictionBatcher(predict, window_ms=100, max_rows=64)
+    results, errors = run_concurrently(batcher.submit, [1, 2, -1, 3])
+
+    assert results[:2] + results[3:] == [10, 20, 30]
+    assert errors[:2] + errors[3:] == [None, None, None]
+    assert isinstance(errors[2], ValueError)
+    # Unless the bad row happened to run alone, its batch was split
+    assert batcher.get_stats()['split_batches'] >= 1 or max(calls) == 1
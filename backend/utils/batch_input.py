@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+CSV_TYPES = ('text/csv', 'application/csv')
+
+
+def _parse_csv(text):
+    """Parse CSV text into a list of dicts, dropping empty cells"""
+    reader = csv.DictReader(io.StringIO(text))
+    records = []
+    for row in reader:
+        records.append({
+            key.strip(): value.strip()
+            for key, value in row.items()
+            if key is not None and value is not None and value.strip() != ''
+        })
+    return records, []
+
+
+def _parse_ndjson(text):
+    """
+    Parse newline-delimited JSON.
+    Returns (records, errors) where errors are {'line', 'error'} dicts.
+    """
+    records = []
+    errors = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            errors.append({'line': line_no, 'error': f"Invalid JSON: {e}"})
+            continue
+        if not isinstance(record, dict):
+            errors.append({'line': line_no, 'error': "Each line must be a JSON object"})
+            continue
+        records.append(record)
+    return records, errors
+
+
+def parse_batch_records(req):
+    """
+    Extract batch records from a Flask request.
+
+    Supported inputs:
+    - JSON array of objects, or {"records": [...], "user_email": ...}
+    - NDJSON body (application/x-ndjson)
+    - CSV body (text/csv)
+    - Multipart upload in the 'file' field (.csv, .ndjson or .jsonl)
+
+    Returns:
+        (records, defaults, errors)
+        records: list of dicts
+        defaults: top-level fields applied to every record (e.g. user_email)
+        errors: parse errors that could not be mapped to a record
+
+    Raises:
+        ValueError if the payload format is not recognised
+    """
+    upload = req.files.get('file') if req.files else None
+    if upload:
+        text = upload.read().decode('utf-8-sig')
+        filename = (upload.filename or '').lower()
+        defaults = {'user_email': req.form.get('user_email')} if req.form.get('user_email') else {}
+        if filename.endswith('.csv') or upload.mimetype in CSV_TYPES:
+            records, errors = _parse_csv(text)
+        elif filename.endswith(('.ndjson', '.jsonl')) or upload.mimetype in NDJSON_TYPES:
+            records, errors = _parse_ndjson(text)
+        else:
+            raise ValueError("Unsupported file type, expected .csv or .ndjson")
+        return records, defaults, errors
+
+    mimetype = req.mimetype or ''
+    if mimetype in CSV_TYPES:
+        records, errors = _parse_csv(req.get_data(as_text=True).lstrip('\ufeff'))
+        return records, {}, errors
+    if mimetype in NDJSON_TYPES:
+        records, errors = _parse_ndjson(req.get_data(as_text=True))
+        return records, {}, errors
+
+    payload = req.get_json(silent=True)
+    if isinstance(payload, list):
+        return payload, {}, []
+    if isinstance(payload, dict) and isinstance(payload.get('records'), list):
+        defaults = {k: v for k, v in payload.items() if k != 'records'}
+        return payload['records'], defaults, []
+
+    raise ValueError("Expected a JSON array, {\"records\": [...]}, CSV or NDJSON payload")
@@ -0,0 +1,50 @@
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_DECODE = {char: index for index, char in enumerate(_BASE32)}
+
+
+def encode(lat, lon, precision=5):
+    """
+    Encode a coordinate as a geohash of `precision` characters
+
+    Precision 5 cells are about 4.9 km x 4.9 km, 6 about 1.2 km x 0.6 km.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def decode(geohash):
+    """Return the (lat, lon) centre of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
@@ -0,0 +1,97 @@
+import hashlib
+from tempfile import SpooledTemporaryFile
+
+from flask import Request
+from PIL import Image
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from config import Config
+
+
+class InvalidImage(ValueError):
+    """Raised when an upload cannot be decoded as an image"""
+
+
+class HashingSpooledFile:
+    """
+    Size-bounded upload buffer that hashes the file while it streams in
+
+    Data stays in memory up to `spool_size` bytes, then moves to a
+    temporary file. Writing more than `max_bytes` raises
+    RequestEntityTooLarge, so oversized uploads without a Content-Length
+    are cut off as soon as they cross the limit.
+    """
+
+    def __init__(self, max_bytes, spool_size):
+        self.max_bytes = max_bytes   # None = no per-file limit
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = SpooledTemporaryFile(max_size=spool_size, mode='w+b')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise RequestEntityTooLarge(f"Uploaded file exceeds {self.max_bytes} bytes")
+        self._hash.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def __getattr__(self, name):
+        # read, readline, seek, tell, close, ... come from the spooled file
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class UploadRequest(Request):
+    """
+    Request class whose file uploads stream into HashingSpooledFile
+
+    The UPLOAD_MAX_FILE_BYTES cap applies only to image endpoints; other
+    uploads (CSV/NDJSON batches) are bounded by MAX_CONTENT_LENGTH alone.
+    """
+
+    IMAGE_ENDPOINTS = frozenset({'analyze_health_route'})
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        max_bytes = Config.UPLOAD_MAX_FILE_BYTES if self.endpoint in self.IMAGE_ENDPOINTS else None
+        return HashingSpooledFile(max_bytes, Config.UPLOAD_SPOOL_SIZE)
+
+
+def load_thumbnail(stream, size):
+    """
+    Decode an uploaded image straight to a small RGB thumbnail
+
+    JPEGs are decoded at reduced scale (Image.draft), so their
+    full-resolution bitmap is never held in memory. Other formats (PNG,
+    WebP, ...) are decoded at full size and then shrunk with reduce()
+    before resampling; for those, UPLOAD_MAX_PIXELS bounds the memory used.
+
+    Args:
+        stream: Readable file object positioned at the start of the image
+        size: Longest side of the thumbnail, in pixels
+
+    Returns:
+        (thumbnail, (original_width, original_height))
+
+    Raises:
+        InvalidImage if the data is not a supported image or is too large
+    """
+    try:
+        image = Image.open(stream)
+        original_size = image.size
+        if original_size[0] * original_size[1] > Config.UPLOAD_MAX_PIXELS:
+            raise InvalidImage(f"Image has too many pixels ({original_size[0]}x{original_size[1]})")
+        image.draft('RGB', (size, size))
+        image.thumbnail((size, size), reducing_gap=2.0)
+        return image.convert('RGB'), original_size
+    except InvalidImage:
+        raise
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        # PIL's message includes the repr of our spool object; keep it out of responses
+        print(f"Warning: Could not decode uploaded image: {e}")
+        raise InvalidImage("Uploaded file is not a valid image") from e
@@ -0,0 +1,334 @@
+"""
+Weather lookups for /api/weather
+
+Providers (the local stub, OpenWeather) sit behind a cache keyed on the
+geohash cell of the coordinate and a time bucket, so nearby requests in
+the same interval share one upstream call:
+
+- A cell's entry is fresh for the time bucket it was fetched in
+  (WEATHER_CACHE_TTL seconds, aligned to the clock so every worker rolls
+  over at the same moment).
+- After that, for up to WEATHER_STALE_TTL more seconds, the old value is
+  served immediately while one background refresh fetches the new one
+  (stale-while-revalidate). If the provider is down, stale values keep
+  being served until they expire.
+- Concurrent misses for the same cell wait on a single upstream call
+  (single-flight) instead of each calling the provider.
+
+HTTP providers share one pooled keep-alive client (see http_client.py).
+"""
+
+import abc
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from http_client import get_http_client
+from utils import geohash
+
+
+class WeatherUnavailable(Exception):
+    """Raised when the provider fails and no usable cached value exists"""
+
+
+# --- Providers -----------------------------------------------------------
+
+class WeatherProvider(abc.ABC):
+    """Interface for weather sources"""
+
+    name = 'base'
+
+    @abc.abstractmethod
+    def fetch(self, lat, lon):
+        """
+        Return {"rainfall": mm, "temperature": Celsius, "humidity": %}
+        for a coordinate; raise on failure
+        """
+
+
+class StubWeatherProvider(WeatherProvider):
+    """
+    Local provider for development and tests: plausible values derived
+    from the coordinate, so repeated calls for a place agree
+    """
+
+    name = 'stub'
+
+    def __init__(self, delay=0.0):
+        self.delay = delay   # simulated upstream latency, seconds
+        self.calls = 0
+
+    def fetch(self, lat, lon):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        rng = random.Random(f"{lat:.4f},{lon:.4f}")
+        return {
+            "rainfall": round(rng.uniform(50.0, 300.0), 2),   # mm
+            "temperature": round(rng.uniform(20.0, 35.0), 2), # Celsius
+            "humidity": round(rng.uniform(40.0, 90.0), 2)     # %
+        }
+
+
+class OpenWeatherProvider(WeatherProvider):
+    """
+    Current conditions from the OpenWeather API
+
+    base_url can point at a local stand-in server that serves
+    /data/2.5/weather for testing.
+    """
+
+    name = 'openweather'
+
+    def __init__(self, api_key, client, base_url='https://api.openweathermap.org'):
+        if not api_key:
+            raise ValueError("OPENWEATHER_API_KEY is required for the openweather provider")
+        self.api_key = api_key
+        self.client = client
+        self.base_url = base_url.rstrip('/')
+
+    def fetch(self, lat, lon):
+        payload = self.client.get_json(
+            f"{self.base_url}/data/2.5/weather",
+            params={'lat': lat, 'lon': lon, 'appid': self.api_key, 'units': 'metric'}
+        )
+        rain = payload.get('rain') or {}
+        return {
+            "rainfall": float(rain.get('1h', rain.get('3h', 0.0))),
+            "temperature": float(payload['main']['temp']),
+            "humidity": float(payload['main']['humidity'])
+        }
+
+
+def create_provider(name=None):
+    """Build the provider selected by WEATHER_PROVIDER"""
+    name = (name or Config.WEATHER_PROVIDER).lower()
+    if name == 'stub':
+        return StubWeatherProvider()
+    if name == 'openweather':
+        client = get_http_client(
+            'weather',
+            pool_size=Config.WEATHER_HTTP_POOL_SIZE,
+            max_concurrency=Config.WEATHER_HTTP_MAX_CONCURRENCY,
+            connect_timeout=Config.WEATHER_CONNECT_TIMEOUT,
+            read_timeout=Config.WEATHER_TIMEOUT,
+            retries=Config.WEATHER_HTTP_RETRIES,
+            backoff=Config.WEATHER_HTTP_BACKOFF
+        )
+        return OpenWeatherProvider(Config.OPENWEATHER_API_KEY, client, base_url=Config.OPENWEATHER_BASE_URL)
+    raise ValueError(f"Unknown weather provider: {name!r}")
+
+
+# --- Cache ---------------------------------------------------------------
+
+class _Flight:
+    """One in-progress upstream call that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class WeatherService:
+    """
+    Provider fronted by a geohash/time-bucket cache
+
+    Args:
+        provider: WeatherProvider instance
+        precision: Geohash length of a cache cell
+        ttl: Time bucket length in seconds (how long a value is fresh)
+        stale_ttl: Extra seconds a value may be served while refreshing
+        maxsize: Maximum cached cells (least recently used are evicted)
+        wait_timeout: Seconds a coalesced caller waits for the shared call
+    """
+
+    def __init__(self, provider, precision=5, ttl=600, stale_ttl=1800, maxsize=10000, wait_timeout=10.0):
+        self.provider = provider
+        self.precision = precision
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.wait_timeout = wait_timeout
+        self._entries = OrderedDict()   # cell -> (value, bucket, fetched_at)
+        self._inflight = {}             # cell -> _Flight
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'refreshes': 0,
+            'provider_calls': 0,
+            'provider_errors': 0,
+            'evictions': 0
+        }
+
+    def cell_for(self, lat, lon):
+        return geohash.encode(lat, lon, self.precision)
+
+    def _bucket(self, now):
+        return int(now // self.ttl)
+
+    def get(self, lat, lon):
+        """
+        Weather for a coordinate
+
+        Returns:
+            (weather dict, cache status: 'hit', 'stale' or 'miss', geohash cell)
+
+        Raises:
+            WeatherUnavailable if the provider fails and nothing usable is cached
+        """
+        cell = self.cell_for(lat, lon)
+        now = time.time()
+        bucket = self._bucket(now)
+
+        with self._lock:
+            entry = self._entries.get(cell)
+            if entry is not None:
+                value, entry_bucket, fetched_at = entry
+                if entry_bucket == bucket:
+                    self._entries.move_to_end(cell)
+                    self._stats['hits'] += 1
+                    return dict(value), 'hit', cell
+                if now - fetched_at <= self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(cell)
+                    self._stats['stale_hits'] += 1
+                    refresh = cell not in self._inflight
+                    if refresh:
+                        self._inflight[cell] = _Flight()
+                        self._stats['refreshes'] += 1
+                else:
+                    del self._entries[cell]
+                    entry = None
+
+            if entry is None:
+                flight = self._inflight.get(cell)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[cell] = _Flight()
+                    self._stats['misses'] += 1
+                else:
+                    self._stats['coalesced'] += 1
+
+        if entry is not None:
+            if refresh:
+                threading.Thread(
+                    target=self._fetch, args=(cell, bucket), name='weather-refresh', daemon=True
+                ).start()
+            return dict(value), 'stale', cell
+
+        if leader:
+            self._fetch(cell, bucket)
+        else:
+            flight.done.wait(self.wait_timeout)
+        if flight.error is not None or flight.value is None:
+            raise WeatherUnavailable(f"Weather provider failed: {flight.error or 'timed out'}")
+        return dict(flight.value), 'miss', cell
+
+    def get_many(self, points, max_workers=10):
+        """
+        Weather for many coordinates
+
+        Points are reduced to their distinct geohash cells, and the cells
+        are looked up concurrently (through the cache, so hits cost nothing
+        and misses still coalesce with other requests).
+
+        Args:
+            points: list of (lat, lon)
+            max_workers: Cells looked up at once
+
+        Returns:
+            list of (weather dict, cache status, cell) or (None, error message, cell),
+            in input order
+        """
+        cells = [self.cell_for(lat, lon) for lat, lon in points]
+        distinct = {}
+        for cell, point in zip(cells, points):
+            distinct.setdefault(cell, point)
+
+        def lookup(point):
+            try:
+                return self.get(*point)
+            except WeatherUnavailable as e:
+                return None, str(e), None
+
+        if len(distinct) == 1:
+            results = {cell: lookup(point) for cell, point in distinct.items()}
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(distinct)) or 1) as executor:
+                futures = {cell: executor.submit(lookup, point) for cell, point in distinct.items()}
+                results = {cell: future.result() for cell, future in futures.items()}
+
+        output = []
+        for cell in cells:
+            value, status, _ = results[cell]
+            output.append((dict(value) if value is not None else None, status, cell))
+        return output
+
+    def _fetch(self, cell, bucket):
+        """Call the provider for a cell (at its centre) and publish the result"""
+        with self._lock:
+            flight = self._inflight[cell]
+            self._stats['provider_calls'] += 1
+        lat, lon = geohash.decode(cell)
+        try:
+            value = self.provider.fetch(lat, lon)
+        except Exception as e:
+            print(f"Warning: Weather provider {self.provider.name} failed for cell {cell}: {e}")
+            flight.error = e
+            with self._lock:
+                self._stats['provider_errors'] += 1
+        else:
+            flight.value = value
+            with self._lock:
+                self._entries[cell] = (value, bucket, time.time())
+                self._entries.move_to_end(cell)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+        finally:
+            with self._lock:
+                del self._inflight[cell]
+            flight.done.set()
+
+    def stats(self):
+        """Return cache and provider metrics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            stats['inflight'] = len(self._inflight)
+        stats['provider'] = self.provider.name
+        stats['precision'] = self.precision
+        stats['ttl'] = self.ttl
+        stats['stale_ttl'] = self.stale_ttl
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_rate'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else 0
+        return stats
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_weather_service():
+    """Return the process-wide weather service, creating it on first use"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = WeatherService(
+                    create_provider(),
+                    precision=Config.WEATHER_GEOHASH_PRECISION,
+                    ttl=Config.WEATHER_CACHE_TTL,
+                    stale_ttl=Config.WEATHER_STALE_TTL,
+                    maxsize=Config.WEATHER_CACHE_SIZE,
+                    # Long enough for the shared call's retries and backoff
+                    wait_timeout=(Config.WEATHER_CONNECT_TIMEOUT + Config.WEATHER_TIMEOUT)
+                    * (Config.WEATHER_HTTP_RETRIES + 1) + 1
+                )
+    return _service